@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+
+# Python Standard Library
+import sys
+import time
+import tracemalloc
+
+# Pandoc
+import pandoc
+from pandoc.types import *
+from json_codec import make_json
+
+# Apply Benchmark
+# ------------------------------------------------------------------------------
+# Duration and peak memory (measured with tracemalloc) of pandoc.apply on a
+# large document, for a transform that changes nothing and for a transform
+# that only changes the links (with and without a {type: transform} dict,
+# that allows the traversal to skip the subtrees that cannot contain links).
+#
+# Usage: python benchmarks/apply.py [SCALE]
+
+
+def no_change(elt):
+    pass
+
+
+def https(elt):
+    if isinstance(elt, Link):
+        attr, inlines, (url, title) = elt[:]
+        if url.startswith("http:"):
+            return Link(attr, inlines, ("https:" + url[5:], title))
+
+
+def measure(function, *args):
+    start = time.perf_counter()
+    function(*args)
+    duration = time.perf_counter() - start
+    tracemalloc.start()
+    function(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return duration, peak
+
+
+if __name__ == "__main__":
+    scale = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    doc = pandoc.read_json_v2(make_json(scale))
+    transforms = {
+        "no_change": no_change,
+        "https": https,
+        "{Link: https}": {Link: https},
+    }
+    for name, transform in transforms.items():
+        duration, peak = measure(pandoc.apply, transform, doc)
+        print(f"{name:<14}: {duration:6.2f} s, " f"peak memory {peak / 1e6:6.1f} MB")
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+
+# Python Standard Library
+import copy
+import sys
+import time
+
+# Pandoc
+import pandoc
+from pandoc.types import *
+from json_codec import make_json
+
+# Diff Benchmark
+# ------------------------------------------------------------------------------
+# Duration of pandoc.diff and pandoc.patch for a large document and a copy
+# with a few edits (an inline changed in the first block, a paragraph
+# inserted in the middle, the last block deleted), the size of the edit
+# script, and for documents of increasing size. The copies of the manual in
+# the document are numbered: a periodic document is a worst case for the
+# alignment of the lists, where a copy is easily mistaken for another one.
+#
+# Usage: python benchmarks/diff.py [SCALE]
+
+
+def numbered(scale):
+    doc = pandoc.read_json_v2(make_json(scale))
+    blocks = doc[1]
+    size = len(blocks) // scale
+    for k in reversed(range(scale)):
+        blocks.insert(k * size, Header(1, ("", [], []), [Str(f"Part {k + 1}")]))
+    return doc
+
+
+def edit(doc):
+    doc = copy.deepcopy(doc)
+    blocks = doc[1]
+    for elt in pandoc.iter(blocks[0]):
+        if isinstance(elt, Str):
+            elt[0] = elt[0].upper()
+            break
+    blocks.insert(len(blocks) // 2, Para([Str("Inserted.")]))
+    del blocks[-1]
+    return doc
+
+
+def timeit(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+if __name__ == "__main__":
+    scale = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    for scale_ in sorted({1, scale // 2, scale} - {0}):
+        old = numbered(scale_)
+        new = edit(old)
+        diff_duration, script = timeit(pandoc.diff, old, new)
+        doc = copy.deepcopy(old)
+        patch_duration, doc = timeit(pandoc.patch, doc, script)
+        assert doc == new
+        print(
+            f"scale {scale_:<3}: {len(old[1]):6} blocks, "
+            f"{len(script)} edits, diff {diff_duration:6.2f} s, "
+            f"patch {1000 * patch_duration:6.2f} ms"
+        )
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+
+# Python Standard Library
+import sys
+import time
+import tracemalloc
+
+# Pandoc
+import pandoc
+from pandoc.types import *
+from json_codec import make_json
+from traversal import deep
+
+# Equality Benchmark
+# ------------------------------------------------------------------------------
+# Duration and peak memory (measured with tracemalloc) of the comparison of
+# two copies of a large document (equal, then different at the end), with ==
+# and with pandoc.equal (which also locates the first difference), and of two
+# copies of a deep document.
+#
+# Usage: python benchmarks/equality.py [SCALE] [DEPTH]
+
+
+def measure(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    duration = time.perf_counter() - start
+    tracemalloc.start()
+    function(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, duration, peak
+
+
+benchmarks = {
+    "==": lambda doc1, doc2: doc1 == doc2,
+    "equal": lambda doc1, doc2: pandoc.equal(doc1, doc2),
+    "equal (path)": lambda doc1, doc2: pandoc.equal(doc1, doc2, path=True)[0],
+}
+
+if __name__ == "__main__":
+    scale = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    depth = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+    json_ = make_json(scale)
+    doc1, doc2 = pandoc.read_json_v2(json_), pandoc.read_json_v2(json_)
+    doc3 = pandoc.read_json_v2(json_)
+    doc3[1][-1] = Para([Str("The end.")])
+    pairs = {
+        "equal": (doc1, doc2),
+        "different": (doc1, doc3),
+        "deep": (deep(depth), deep(depth)),
+    }
+    for pair_name, (doc1, doc2) in pairs.items():
+        for name, benchmark in benchmarks.items():
+            result, duration, peak = measure(benchmark, doc1, doc2)
+            print(
+                f"{pair_name:<9} {name:<12}: {result!s:<5} {duration:6.2f} s, "
+                f"peak memory {peak / 1e6:6.1f} MB"
+            )
@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+
+# Python Standard Library
+import statistics
+import subprocess
+import sys
+
+# Import-Time Benchmark
+# ------------------------------------------------------------------------------
+# Every measure is made in a fresh Python interpreter ; the disk cache is warm
+# after the first run, so we report the median of the remaining runs.
+#
+# Usage: python benchmarks/import_time.py [RUNS]
+
+statements = [
+    "import pandoc",
+    "import pandoc.utils",
+    "import pandoc.types",
+]
+
+template = """
+import time
+t = time.perf_counter()
+{statement}
+print(time.perf_counter() - t)
+"""
+
+
+def measure(statement, runs):
+    code = template.format(statement=statement)
+    times = []
+    for _ in range(runs + 1):
+        output = subprocess.check_output([sys.executable, "-c", code])
+        times.append(float(output))
+    return statistics.median(times[1:])
+
+
+if __name__ == "__main__":
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    for statement in statements:
+        duration = measure(statement, runs)
+        print(f"{statement:<24} {1000 * duration:8.1f} ms")
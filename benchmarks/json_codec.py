@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+
+# Python Standard Library
+import json
+import pathlib
+import subprocess
+import sys
+import time
+import tracemalloc
+
+# Pandoc
+import pandoc
+import pandoc.types
+
+# JSON Codec Benchmark
+# ------------------------------------------------------------------------------
+# The test document is pandoc's user manual, with its blocks repeated to get
+# a large document (about 13 MB of JSON with the default scale).
+# The peak memory used to produce the JSON text of the document is measured
+# with tracemalloc.
+#
+# Usage: python benchmarks/json_codec.py [SCALE]
+
+root = pathlib.Path(__file__).parent.parent
+manual = root / "mkdocs" / "manual" / "MANUAL.txt"
+
+
+def make_json(scale):
+    path = pandoc.configure(read=True)["path"]
+    output = subprocess.check_output([path, "-f", "markdown", "-t", "json", manual])
+    json_ = json.loads(output)
+    json_["blocks"] = scale * json_["blocks"]
+    return json_
+
+
+def timeit(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+def peak_memory(function, *args):
+    tracemalloc.start()
+    function(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+class Sink:
+    def write(self, data):
+        pass
+
+
+def write_json_text(doc):  # JSON data, then text, then bytes.
+    Sink().write(json.dumps(pandoc.write_json_v2(doc)).encode("utf-8"))
+
+
+def dump_json_text(doc):  # streamed text
+    pandoc.dump_json_v2(doc, Sink())
+
+
+if __name__ == "__main__":
+    scale = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    json_ = make_json(scale)
+    json_str = json.dumps(json_)
+    print(f"JSON size: {len(json_str) / 1e6:.1f} MB")
+    duration, _ = timeit(json.loads, json_str)
+    print(f"json.loads:    {duration:6.2f} s")
+    duration, doc = timeit(pandoc.read_json_v2, json_)
+    print(f"read_json_v2:  {duration:6.2f} s")
+    duration, json_ = timeit(pandoc.write_json_v2, doc)
+    print(f"write_json_v2: {duration:6.2f} s")
+    duration, _ = timeit(json.dumps, json_)
+    print(f"json.dumps:    {duration:6.2f} s")
+    del json_
+    duration, _ = timeit(dump_json_text, doc)
+    print(f"dump_json_v2:  {duration:6.2f} s")
+    for function in [write_json_text, dump_json_text]:
+        peak = peak_memory(function, doc)
+        print(f"{function.__name__}: peak memory {peak / 1e6:6.1f} MB")
@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+
+# Python Standard Library
+import statistics
+import sys
+import time
+
+# Pandoc
+import pandoc
+from pandoc.types import *
+
+# Small-Document Latency Benchmark
+# ------------------------------------------------------------------------------
+# Median duration of a pandoc.read / pandoc.write call for a one-paragraph
+# document; this is dominated by the pandoc process and the I/O around it.
+#
+# Usage: python benchmarks/latency.py [RUNS]
+
+text = "Hello *world*!"
+doc = pandoc.read(text)
+
+
+def measure(function, runs):
+    durations = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations)
+
+
+benchmarks = {
+    "read (markdown)": lambda: pandoc.read(text),
+    "write (markdown)": lambda: pandoc.write(doc),
+    "write (html)": lambda: pandoc.write(doc, format="html"),
+    "write (docx)": lambda: pandoc.write(doc, format="docx"),
+}
+
+if __name__ == "__main__":
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    for name, function in benchmarks.items():
+        duration = measure(function, runs)
+        print(f"{name:<20} {1000 * duration:8.2f} ms")
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+
+# Python Standard Library
+import gc
+import json
+import sys
+import time
+import tracemalloc
+
+# Pandoc
+import pandoc
+from pandoc.types import *
+from json_codec import make_json
+
+# Node Memory Benchmark
+# ------------------------------------------------------------------------------
+# Memory (measured with tracemalloc) held by a large document decoded from its
+# JSON text (strings included), per pandoc element (constructor instance), and
+# the duration of the decoding, without and with shared instances for the
+# constructors without arguments (flyweights) and the interning of strings and
+# small values.
+#
+# Usage: python benchmarks/node_memory.py [SCALE]
+
+modes = {
+    "default": [],
+    "flyweights": [pandoc.types.enable_flyweights],
+    "interning": [pandoc.types.enable_interning],
+    "both": [pandoc.types.enable_flyweights, pandoc.types.enable_interning],
+}
+
+
+def count_elements(doc):
+    return sum(1 for elt in pandoc.iter(doc) if isinstance(elt, Constructor))
+
+
+def set_mode(mode):  # the intern table is reset
+    pandoc.types.disable_flyweights()
+    pandoc.types.disable_interning()
+    for enable in modes[mode]:
+        enable()
+
+
+def measure(json_text, mode):
+    json_ = json.loads(json_text)
+    set_mode(mode)
+    start = time.perf_counter()
+    pandoc.read_json_v2(json_)
+    duration = time.perf_counter() - start
+    del json_
+    gc.collect()
+    tracemalloc.start()
+    set_mode(mode)
+    doc = pandoc.read_json_v2(json.loads(json_text))
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return doc, size, duration
+
+
+if __name__ == "__main__":
+    scale = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    json_text = json.dumps(make_json(scale))
+    for mode in modes:
+        doc, size, duration = measure(json_text, mode)
+        count = count_elements(doc)
+        del doc
+        print(
+            f"{mode:<10}: {count} elements, {size / 1e6:6.1f} MB, "
+            f"{size / count:6.1f} bytes per element, decoded in {duration:5.2f} s"
+        )
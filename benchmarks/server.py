@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+
+# Python Standard Library
+import concurrent.futures
+import sys
+import time
+
+# Pandoc
+import pandoc
+
+# Pandoc Server Throughput Benchmark
+# ------------------------------------------------------------------------------
+# Conversions per second of small documents (read from markdown, then write
+# to html) with a new pandoc process per conversion and with a pandoc server,
+# with one or several client threads. The pandoc server (`pandoc server`)
+# should be started beforehand, where its port is not exposed.
+#
+# Usage: python benchmarks/server.py URL [CONVERSIONS] [THREADS]
+
+text = "Hello *world*!"
+
+
+def convert(_):
+    doc = pandoc.read(text)
+    return pandoc.write(doc, format="html")
+
+
+def throughput(conversions, threads):
+    with concurrent.futures.ThreadPoolExecutor(threads) as executor:
+        start = time.perf_counter()
+        list(executor.map(convert, range(conversions)))
+        return conversions / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    url = sys.argv[1]
+    conversions = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    max_threads = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+    for backend, server in [("subprocess", None), ("server", url)]:
+        pandoc.configure(auto=True, server=server)
+        convert(None)  # warm-up
+        for threads in sorted({1, max_threads}):
+            rate = throughput(conversions, threads)
+            print(f"{backend:<10} {threads} thread(s): {rate:8.1f} conversions/s")
@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+
+# Python Standard Library
+import sys
+import time
+
+# Pandoc
+import pandoc
+from pandoc.types import *
+
+# Deep and Wide Traversal Benchmark
+# ------------------------------------------------------------------------------
+# Duration of a full pandoc.iter and pandoc.apply traversal on synthetic
+# documents: a deep one (nested block quotes and emphasis) and a wide one
+# (a single paragraph with many words), with the same number of words.
+#
+# Usage: python benchmarks/traversal.py [DEPTH]
+
+
+def deep(depth):
+    inlines = [Str("word")]
+    for _ in range(depth):
+        inlines = [Emph(inlines)]
+    blocks = [Para(inlines)]
+    for _ in range(depth):
+        blocks = [BlockQuote(blocks)]
+    return Pandoc(Meta({}), blocks)
+
+
+def wide(width):
+    inlines = []
+    for _ in range(width):
+        inlines.extend([Str("word"), Space()])
+    return Pandoc(Meta({}), [Para(inlines)])
+
+
+def no_change(elt):
+    pass
+
+
+def measure(function, *args):
+    start = time.perf_counter()
+    try:
+        function(*args)
+    except RecursionError:
+        return None
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    docs = {"deep": deep(depth), "wide": wide(depth * depth // 10)}
+    benchmarks = {
+        "iter": lambda doc: sum(1 for _ in pandoc.iter(doc)),
+        "iter (path)": lambda doc: sum(1 for _ in pandoc.iter(doc, path=True)),
+        "apply": lambda doc: pandoc.apply(no_change, doc),
+    }
+    for doc_name, doc in docs.items():
+        for name, benchmark in benchmarks.items():
+            duration = measure(benchmark, doc)
+            result = "RecursionError" if duration is None else f"{duration:6.2f} s"
+            print(f"{doc_name:<4} {name:<12}: {result}")
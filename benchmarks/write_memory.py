@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+
+# Python Standard Library
+import os
+import sys
+import tempfile
+import tracemalloc
+
+# Pandoc
+import pandoc
+from json_codec import make_json
+
+# Write Memory Benchmark
+# ------------------------------------------------------------------------------
+# Peak memory (measured with tracemalloc) used by pandoc.write on top of the
+# document when the output is written to a file, with and without streaming.
+#
+# Usage: python benchmarks/write_memory.py [SCALE] [FORMAT]
+
+
+def peak_memory(function, *args, **kwargs):
+    tracemalloc.start()
+    function(*args, **kwargs)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+if __name__ == "__main__":
+    scale = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    format = sys.argv[2] if len(sys.argv) > 2 else "html"
+    doc = pandoc.read_json_v2(make_json(scale))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        filename = os.path.join(tmp_dir, "output")
+        for stream in [False, True]:
+            peak = peak_memory(
+                pandoc.write, doc, file=filename, format=format, stream=stream
+            )
+            size = os.path.getsize(filename)
+            print(
+                f"stream={stream!s:<5}: output {size / 1e6:6.1f} MB, "
+                f"peak memory {peak / 1e6:6.1f} MB"
+            )
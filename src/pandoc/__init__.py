@@ -2,25 +2,44 @@
 
 # Python 3 Standard Library
 import argparse
+import asyncio
+import atexit
+import base64
 import collections
+import concurrent.futures
+import contextlib
 import copy
+import difflib
+import hashlib
+import http.client
+import io
 import json
 import os.path
 import pathlib
+import re
 import shutil
+import subprocess
 import sys
+import threading
 import time
 import tempfile
+import urllib.parse
+import uuid
+import weakref
 
 # Third-Party Libraries
 import plumbum
 
 # Pandoc
 import pandoc.about
+from . import cache
 from . import utils
 
 # Filesystem Helper
 # ------------------------------------------------------------------------------
+_CHUNK_SIZE = 2**16  # for streamed I/O
+
+
 def rmtree(path):
     """Deal with Windows
     (see e.g <https://www.gitmemory.com/issue/sdispater/poetry/1031/488759621>
@@ -55,6 +74,7 @@ def configure(
     pandoc_types_version=None,
     read=False,
     reset=False,
+    server=None,
 ):
     global _configuration
 
@@ -65,6 +85,7 @@ def configure(
         and pandoc_types_version is None
         and read is False
         and reset is False
+        and server is None
     )
     if default:
         error = "configure expects at least one argument."
@@ -72,6 +93,7 @@ def configure(
 
     if reset is True:
         _configuration = None  # TODO: clean the types
+        _close_server_connections()
         return
 
     read_only = (
@@ -80,6 +102,7 @@ def configure(
         and path is None
         and version is None
         and pandoc_types_version is None
+        and server is None
     )
 
     if auto:
@@ -98,10 +121,10 @@ def configure(
             error += "but it doesn't match path={1!r}."
             raise ValueError(error.format(found_path, path))
 
+    found_pandoc_types_versions = None
     if path is not None:
         # TODO: manage invalid path
-        pandoc = plumbum.machines.LocalCommand(path, "utf-8")
-        found_version = pandoc("--version").splitlines()[0].split(" ")[1]
+        found_version, found_pandoc_types_versions = _probe(path)
         if version is None:
             version = found_version
         elif version != found_version:
@@ -109,8 +132,25 @@ def configure(
             error += "but it doesn't match version={1!r}."
             raise ValueError(error.format(found_version, version))
 
+    if server is not None and not isinstance(server, str):
+        error = "server should be the URL of a running pandoc server, not {0!r}."
+        raise TypeError(error.format(server))
+    if isinstance(server, str):
+        server_version = _server_version(server)
+        if server_version is None:
+            if version is None:
+                error = "cannot get the version of the pandoc server at {0!r}."
+                raise RuntimeError(error.format(server))
+        elif version is None:
+            version = server_version
+        elif version != server_version:
+            error = "the version of the pandoc server is {0!r} "
+            error += "but it doesn't match version={1!r}."
+            raise ValueError(error.format(server_version, version))
+
     if version is not None:
-        found_pandoc_types_versions = utils.resolve(version, warn=True)
+        if found_pandoc_types_versions is None:
+            found_pandoc_types_versions = utils.resolve(version, warn=True)
         if pandoc_types_version is None:
             if len(found_pandoc_types_versions) >= 1:
                 # pick latest (ignore the real one that may be unknown)
@@ -138,17 +178,72 @@ def configure(
             "path": path,
             "version": version,
             "pandoc_types_version": pandoc_types_version,
+            "server": server,
         }
 
         types.make_types()
+        _json_decoders.clear()
+        _json_encoders.clear()
+        _json_streamed.clear()
+        _constructor_graph.clear()
+        _prunings.clear()
 
     if read:
         return copy.copy(_configuration)
 
 
+def _probe(path):
+    """Get the version of a pandoc executable and the matching pandoc-types
+
+    The result is cached (when the "executable" cache is enabled) with a key
+    derived from the path, modification time and size of the executable.
+    """
+    key = None
+    if cache.is_enabled("executable"):
+        try:
+            stat = os.stat(path)
+            key = f"{os.path.abspath(path)}\0{stat.st_mtime_ns}\0{stat.st_size}"
+            key = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        except OSError:
+            pass
+    if key is not None:
+        entry = cache.load("executable", key)
+        if entry is not None:
+            return entry["version"], entry["pandoc_types_versions"]
+
+    pandoc = plumbum.machines.LocalCommand(path, "utf-8")
+    version = pandoc("--version").splitlines()[0].split(" ")[1]
+    pandoc_types_versions = utils.resolve(version, warn=True)
+    # unsupported versions are not cached, so that the warning is not lost.
+    if key is not None and version in utils.version_mapping:
+        entry = {"version": version, "pandoc_types_versions": pandoc_types_versions}
+        cache.store("executable", key, entry)
+    return version, pandoc_types_versions
+
+
 # JSON Reader / Writer
 # ------------------------------------------------------------------------------
 def read(source=None, file=None, format=None, options=None):
+    source, format, options = _read_args(source, file, format, options)
+    if format == "json":
+        json_ = json.loads(source)
+    else:
+        key = _cache_key("read", source, format, list(options))
+        output = cache.load_bytes("read", key) if key else None
+        if output is None:
+            if not options:
+                output = _server_convert(source, format, "json")
+            if output is None:
+                pandoc_options = ["-t", "json"] + list(options) + ["-f", format]
+                output = _run_pandoc(pandoc_options, source)
+            if key:
+                cache.store_bytes("read", key, output)
+        json_ = json.loads(output)
+    return _read_json(json_)
+
+
+def _read_args(source, file, format, options):
+    "Get the source (as bytes), format and options of a document to read"
     if configure(read=True) is None:
         configure(auto=True)
     if options is None:
@@ -160,52 +255,222 @@ def read(source=None, file=None, format=None, options=None):
             raise ValueError("source or file should be defined.")
         if not hasattr(file, "read"):
             filename = file
-            file = open(filename, "rb")
-        source = file.read()
+            with open(filename, "rb") as file:
+                source = file.read()
+        else:
+            source = file.read()
     else:
         if file is not None:
             raise ValueError("source or file should be defined, not both.")
 
-    tmp_dir = tempfile.mkdtemp()
     if not isinstance(source, bytes):
         source = source.encode("utf-8")
-    input_path = os.path.join(tmp_dir, "input")
-    input = open(input_path, "wb")
-    input.write(source)
-    input.close()
 
     if format is None and filename is not None:
         format = format_from_filename(filename)
     if format is None:
         format = "markdown"
     if format != "json" and _configuration["path"] is None:
-        error = "reading the {0!r} format requires the pandoc program"
-        raise RuntimeError(error.format(format))
-
-    if format == "json":
-        json_file = open(input_path, "r", encoding="utf-8")
-    else:
-        if _configuration["path"] is None:
+        if _configuration["server"] is None:
             error = "reading the {0!r} format requires the pandoc program"
             raise RuntimeError(error.format(format))
-        pandoc = plumbum.machines.LocalCommand(_configuration["path"])
-        output_path = os.path.join(tmp_dir, "output.js")
-        options = (
-            ["-t", "json", "-o", output_path]
-            + list(options)
-            + ["-f", format, input_path]
-        )
-        pandoc(options)
-        json_file = open(output_path, "r", encoding="utf-8")
-    json_ = json.load(json_file)
-    json_file.close()
-    rmtree(tmp_dir)
+    return source, format, options
+
+
+def _cache_key(kind, input, *parameters):
+    """Compute the key of a conversion cache entry (if the cache is enabled)
+
+    The key is a hash of the input (bytes), of the conversion parameters
+    (format, options, etc.), of the versions of pandoc and pandoc-types and
+    of the backend (processes or server). The content of the files used by
+    the options is not taken into account.
+    """
+    if not cache.is_enabled(kind):
+        return None
+    versions = [_configuration["version"], _configuration["pandoc_types_version"]]
+    backend = _configuration["server"] is not None
+    header = json.dumps([list(parameters), versions, backend])
+    sha256 = hashlib.sha256(header.encode("utf-8"))
+    sha256.update(b"\0")
+    sha256.update(input)
+    return sha256.hexdigest()
+
+
+def _read_json(json_):
     if utils.version_key(_configuration["pandoc_types_version"]) < [1, 17]:
         return read_json_v1(json_)
     else:
         return read_json_v2(json_)
 
 
+def _run_pandoc(options, input, output=None):
+    """Run pandoc with its standard input and output connected to pipes
+
+    The input is either a bytes object or a function that writes the input
+    into a binary file. The pandoc output is returned as bytes, unless an
+    output binary file is specified; then it is copied into it chunk by chunk.
+    """
+    if _configuration["path"] is None:
+        raise RuntimeError("this conversion requires the pandoc program")
+    args = [_configuration["path"]] + list(options)
+    process = subprocess.Popen(
+        args, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    if isinstance(input, bytes) and output is None:
+        stdout, stderr = process.communicate(input)
+    else:  # feed and drain the pipes from other threads to avoid deadlocks
+        if isinstance(input, bytes):
+            input_bytes = input
+            input = lambda file: file.write(input_bytes)
+        errors = []
+        stderr_chunks = []
+
+        def feed():
+            try:
+                with process.stdin:
+                    input(process.stdin)
+            except BrokenPipeError:  # pandoc has exited, see its return code
+                pass
+            except BaseException as error:
+                errors.append(error)
+
+        def drain():
+            stderr_chunks.append(process.stderr.read())
+
+        threads = [threading.Thread(target=feed), threading.Thread(target=drain)]
+        for thread in threads:
+            thread.start()
+        try:
+            if output is None:
+                stdout = process.stdout.read()
+            else:
+                shutil.copyfileobj(process.stdout, output, _CHUNK_SIZE)
+                stdout = b""
+        except BaseException:
+            process.kill()
+            raise
+        finally:
+            process.stdout.close()
+            process.wait()
+            for thread in threads:
+                thread.join()
+            process.stderr.close()
+        if errors:
+            raise errors[0]
+        stderr = stderr_chunks[0]
+    if process.returncode != 0:
+        raise plumbum.ProcessExecutionError(
+            args,
+            process.returncode,
+            stdout.decode("utf-8", "replace"),
+            stderr.decode("utf-8", "replace"),
+        )
+    return stdout
+
+
+# Pandoc Server
+# ------------------------------------------------------------------------------
+# With `configure(server=...)`, the conversions that require no extra option
+# are sent to a `pandoc server` (pandoc 3.0 or later) instead of new pandoc
+# processes. The HTTP connections to the server are kept alive and reused.
+# A pandoc subprocess is still used when the server is unreachable or reports
+# an error (then pandoc reports it the usual way).
+#
+# The server is never started here: `pandoc server` has no option to select
+# its network interface, it listens on all of them and does not authenticate
+# its clients. Where and how it is exposed is up to the user.
+_server_connections = collections.defaultdict(list)  # idle, per url
+# The defaults of the command-line tool that differ from the server ones
+_server_defaults = {"highlight-style": "pygments"}
+_server_lock = threading.Lock()
+_binary_input_formats = ["docx", "epub", "odt", "pptx", "xlsx"]
+
+
+@atexit.register
+def _close_server_connections():
+    with _server_lock:
+        for connections in _server_connections.values():
+            for connection in connections:
+                connection.close()
+        _server_connections.clear()
+
+
+def _server_version(url):
+    parts = urllib.parse.urlsplit(url)
+    connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=1.0)
+    try:
+        connection.request("GET", parts.path.rstrip("/") + "/version")
+        response = connection.getresponse()
+        if response.status == 200:
+            return response.read().decode("utf-8").strip()
+    except (OSError, http.client.HTTPException):
+        pass
+    finally:
+        connection.close()
+
+
+def _server_request(url, request):
+    "Send a conversion request to the pandoc server, reuse idle connections"
+    parts = urllib.parse.urlsplit(url)
+    body = json.dumps(request).encode("utf-8")
+    headers = {"Content-Type": "application/json", "Accept": "application/json"}
+    with _server_lock:
+        connections = _server_connections[url]
+        connection = connections.pop() if connections else None
+    while True:
+        reused = connection is not None
+        if not reused:
+            connection = http.client.HTTPConnection(parts.hostname, parts.port)
+        try:
+            connection.request("POST", parts.path or "/", body, headers)
+            response = connection.getresponse()
+            data = response.read()
+            break
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            connection = None
+            if not reused:  # (idle connections may have been closed)
+                raise
+    with _server_lock:
+        _server_connections[url].append(connection)
+    if response.status != 200:
+        return {"error": data.decode("utf-8", "replace")}
+    return json.loads(data)
+
+
+def _server_convert(input, from_, to):
+    """Convert a document (as bytes) with the pandoc server
+
+    Return the output as bytes, or None when the conversion should be done
+    by a pandoc subprocess instead.
+    """
+    url = _configuration["server"]
+    if url is None:
+        return None
+    if from_.split("+")[0].split("-")[0] in _binary_input_formats:
+        text = base64.b64encode(input).decode("ascii")
+    else:
+        try:
+            text = input.decode("utf-8")
+        except UnicodeDecodeError:
+            return None
+    try:
+        request = {"text": text, "from": from_, "to": to, **_server_defaults}
+        response = _server_request(url, request)
+    except (OSError, http.client.HTTPException, ValueError):
+        response = {"error": f"cannot reach the pandoc server at {url!r}"}
+    if "error" in response:
+        if _configuration["path"] is None:
+            raise RuntimeError(response["error"])
+        return None
+    output = response["output"]
+    if response.get("base64"):
+        return base64.b64decode(output)
+    if output and not output.endswith("\n"):  # like the pandoc command-line tool
+        output += "\n"
+    return output.encode("utf-8")
+
+
 # ------------------------------------------------------------------------------
 _ext_to_file_format = {
     ".adoc": "asciidoc",
@@ -265,7 +530,7 @@ for _i in range(1, 10):
 
 
 def format_from_filename(filename):
-    ext = pathlib.Path(filename.lower()).suffix
+    ext = pathlib.Path(os.fspath(filename).lower()).suffix
     return _ext_to_file_format.get(ext)
 
 
@@ -274,7 +539,70 @@ def format_from_filename(filename):
 #       extension)
 
 
-def write(doc, file=None, format=None, options=None):
+def write(doc, file=None, format=None, options=None, stream=False):
+    if stream and file is None:
+        raise ValueError("a file is required when stream=True.")
+    doc, filename, format, options = _write_args(doc, file, format, options)
+    write_input = _json_writer(doc)
+
+    is_pdf = format == "pdf" or (filename is not None and filename.endswith(".pdf"))
+    if stream:  # let pandoc write directly to the file, return a handle
+        if format == "json":
+            if filename is not None:
+                with open(filename, "wb") as file:
+                    write_input(file)
+            else:
+                write_input(file)
+        elif filename is not None:
+            options = ["-t", format, "-o", filename] + list(options)
+            options += ["-f", "json"]
+            _run_pandoc(options, write_input)
+        elif not is_pdf:
+            options = ["-t", format] + list(options) + ["-f", "json"]
+            _run_pandoc(options, write_input, output=file)
+        else:
+            with _pdf_output(format, options) as (options, output_path):
+                _run_pandoc(options, write_input)
+                with open(output_path, "rb") as output_file:
+                    shutil.copyfileobj(output_file, file, _CHUNK_SIZE)
+        return pathlib.Path(filename) if filename is not None else file
+
+    output_bytes = _convert(write_input, format, is_pdf, options)
+    return _write_output(output_bytes, format, is_pdf, file)
+
+
+def _convert(write_input, format, is_pdf, options):
+    "Convert a document (JSON) into the output format, return the output bytes"
+    key = None
+    if format != "json" and cache.is_enabled("write"):
+        input_bytes = _json_bytes(write_input)
+        write_input = lambda file: file.write(input_bytes)
+        key = _cache_key("write", input_bytes, format, is_pdf, list(options))
+        output_bytes = cache.load_bytes("write", key)
+        if output_bytes is not None:
+            return output_bytes
+
+    if format == "json":
+        output_bytes = _json_bytes(write_input)
+    elif not is_pdf:
+        output_bytes = None
+        if _server_writes(format, options):
+            output_bytes = _server_convert(_json_bytes(write_input), "json", format)
+        if output_bytes is None:
+            options = ["-t", format] + list(options) + ["-f", "json"]
+            output_bytes = _run_pandoc(options, write_input)
+    else:  # pandoc needs an output file (with the right extension)
+        with _pdf_output(format, options) as (options, output_path):
+            _run_pandoc(options, write_input)
+            with open(output_path, "rb") as output_file:
+                output_bytes = output_file.read()
+    if key:
+        cache.store_bytes("write", key, output_bytes)
+    return output_bytes
+
+
+def _write_args(doc, file, format, options):
+    "Get the document (as Pandoc), filename, format and options to write"
     if options is None:
         options = []
 
@@ -313,60 +641,566 @@ def write(doc, file=None, format=None, options=None):
 
     doc = elt
 
-    tmp_dir = tempfile.mkdtemp()
     filename = None
     if file is not None and not hasattr(file, "write"):
-        filename = file
-        file = open(filename, "wb")
+        filename = os.fspath(file)
 
     if format is None and filename is not None:
         format = format_from_filename(filename)
     if format is None:
         format = "markdown"  # instead of html, yep.
     if format != "json" and _configuration["path"] is None:
-        error = "writing the {0!r} format requires the pandoc program"
+        if _configuration["server"] is None:
+            error = "writing the {0!r} format requires the pandoc program"
+            raise RuntimeError(error.format(format))
+    return doc, filename, format, options
 
-    configuration = configure(read=True)
-    if utils.version_key(configuration["pandoc_types_version"]) < [1, 17]:
-        json_ = write_json_v1(doc)
-    else:
-        json_ = write_json_v2(doc)
-    json_str = json.dumps(json_)
-    input_path = os.path.join(tmp_dir, "input.js")
-    input = open(input_path, "wb")
-    input.write(json_str.encode("utf-8"))
-    input.close()
 
-    if format == "json":
-        output_path = input_path
+def _json_writer(doc):
+    "Return a function that writes the JSON text of doc into a binary file"
+    if utils.version_key(_configuration["pandoc_types_version"]) < [1, 17]:
+        json_bytes = json.dumps(write_json_v1(doc)).encode("utf-8")
+        return lambda file: file.write(json_bytes)
     else:
-        if filename is not None:
-            # preserve file extensions (for output format inference)
-            tmp_filename = os.path.basename(filename)
-        else:
-            tmp_filename = "output"
-        pandoc = plumbum.machines.LocalCommand(_configuration["path"])
-        output_path = os.path.join(tmp_dir, tmp_filename)
-        options = (
-            ["-t", format, "-o", output_path]
-            + list(options)
-            + ["-f", "json", input_path]
-        )
-        pandoc(options)
+        return lambda file: dump_json_v2(doc, file)
+
+
+def _json_bytes(write_input):
+    buffer = io.BytesIO()
+    write_input(buffer)
+    return buffer.getvalue()
+
+
+_binary_formats = ["docx", "epub", "epub2", "epub3", "odt", "pdf", "pptx"]
 
-    output_bytes = open(output_path, "rb").read()
-    binary_formats = ["docx", "epub", "epub2", "epub3", "odt", "pdf", "pptx"]
-    if format in binary_formats or output_path.endswith(".pdf"):
+
+def _server_writes(format, options):
+    # binary outputs may embed local resources, out of reach of the server
+    return (
+        _configuration["server"] is not None
+        and not options
+        and format not in _binary_formats
+    )
+
+
+def _write_output(output_bytes, format, is_pdf, file):
+    "Save the pandoc output into file (if any), return its content"
+    if format in _binary_formats or is_pdf:
         output = output_bytes
     else:  # text format
         output = output_bytes.decode("utf-8")
-    rmtree(tmp_dir)
 
-    if file is not None:
+    filename = None
+    if file is not None and not hasattr(file, "write"):
+        filename = file
+    if filename is not None:
+        with open(filename, "wb") as file:
+            file.write(output_bytes)
+    elif file is not None:
         file.write(output_bytes)
     return output
 
 
+@contextlib.contextmanager
+def _pdf_output(format, options):
+    "Provide the pandoc options to write PDF into a temporary file"
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        output_path = os.path.join(tmp_dir, "output.pdf")
+        options = ["-t", format, "-o", output_path] + list(options) + ["-f", "json"]
+        yield options, output_path
+    finally:
+        rmtree(tmp_dir)
+
+
+# Batch Conversions
+# ------------------------------------------------------------------------------
+# The conversions are run by a pool of threads: the pandoc processes (or the
+# requests to the pandoc server) run concurrently, and so does the decoding of
+# their output with the next pandoc runs. A bounded number of conversions are
+# in flight, so that arbitrarily long iterables of sources are supported.
+_DEFAULT_JOBS = min(32, (os.cpu_count() or 1) + 4)  # like ThreadPoolExecutor
+
+
+def read_many(
+    sources=None, files=None, format=None, options=None, jobs=None, ordered=True
+):
+    if sources is None and files is None:
+        raise ValueError("sources or files should be defined.")
+    if sources is not None and files is not None:
+        raise ValueError("sources or files should be defined, not both.")
+    if configure(read=True) is None:
+        configure(auto=True)
+    if jobs is None:
+        jobs = _DEFAULT_JOBS
+    if jobs < 1:
+        raise ValueError("jobs should be a positive integer.")
+
+    if sources is not None:
+        read_ = lambda source: read(source, format=format, options=options)
+        items = sources
+    else:
+        read_ = lambda file: read(file=file, format=format, options=options)
+        items = files
+    return _imap(read_, items, jobs, ordered)
+
+
+def write_many(doc, formats=None, files=None, options=None, jobs=None):
+    if formats is None and files is None:
+        raise ValueError("formats or files should be defined.")
+    if formats is None:
+        formats = [None] * len(files)
+    if files is None:
+        files = [None] * len(formats)
+    if len(formats) != len(files):
+        raise ValueError("formats and files should have the same length.")
+    if jobs is None:
+        jobs = min(len(formats), _DEFAULT_JOBS) or 1
+    if jobs < 1:
+        raise ValueError("jobs should be a positive integer.")
+
+    doc, _, _, options = _write_args(doc, None, "json", options)
+    input_bytes = _json_bytes(_json_writer(doc))  # serialized only once
+    write_input = lambda file: file.write(input_bytes)
+
+    targets = []
+    for format, file in zip(formats, files):
+        _, filename, format, _ = _write_args(doc, file, format, options)
+        is_pdf = format == "pdf" or (filename is not None and filename.endswith(".pdf"))
+        targets.append((format, is_pdf, file))
+
+    def convert(target):
+        format, is_pdf, _ = target
+        return _convert(write_input, format, is_pdf, options)
+
+    with concurrent.futures.ThreadPoolExecutor(jobs) as executor:
+        outputs_bytes = list(executor.map(convert, targets))
+    return [
+        _write_output(output_bytes, *target)
+        for output_bytes, target in zip(outputs_bytes, targets)
+    ]
+
+
+def _imap(function, items, jobs, ordered):
+    """Apply function to the items in a thread pool, yield the results
+
+    The results are yielded in order, or as (index, result) pairs as soon as
+    they are available when `ordered` is false.
+    """
+    with concurrent.futures.ThreadPoolExecutor(jobs) as executor:
+        pending = collections.deque() if ordered else {}
+        try:
+            for index, item in enumerate(items):
+                future = executor.submit(function, item)
+                if ordered:
+                    pending.append(future)
+                    if len(pending) >= 2 * jobs:
+                        yield pending.popleft().result()
+                else:
+                    pending[future] = index
+                    if len(pending) >= 2 * jobs:
+                        yield from _completed(pending)
+            if ordered:
+                while pending:
+                    yield pending.popleft().result()
+            else:
+                while pending:
+                    yield from _completed(pending)
+        finally:  # on error or early exit, do not start the pending tasks
+            for future in pending:
+                future.cancel()
+
+
+def _completed(pending):
+    done, _ = concurrent.futures.wait(
+        pending, return_when=concurrent.futures.FIRST_COMPLETED
+    )
+    for future in done:
+        index = pending.pop(future)
+        yield index, future.result()
+
+
+# Snippet Batches
+# ------------------------------------------------------------------------------
+# Many tiny documents (table cells, titles, etc.) are converted with a single
+# pandoc run: they are joined with sentinel paragraphs into one document and
+# the result is split at the sentinels. This is only sound for some formats,
+# without extra options, and when the snippets do not interact (heading
+# identifiers, citation and example numbers, notes collected at the end of
+# the document, etc.); otherwise the snippets are converted one by one.
+_batch_formats = [
+    "commonmark",
+    "commonmark_x",
+    "gfm",
+    "html",
+    "html4",
+    "html5",
+    "latex",
+    "markdown",
+    "markdown_mmd",
+    "markdown_phpextra",
+    "markdown_strict",
+    "mediawiki",
+    "org",
+    "plain",
+    "rst",
+]
+
+
+def _batchable(format, options, count):
+    base_format = format.split("+")[0].split("-")[0]
+    return count >= 2 and not options and base_format in _batch_formats
+
+
+def _sentinel(format):
+    token = "PANDOC" + uuid.uuid4().hex.upper()
+    if format.startswith("html"):
+        return token, f"\n<p>{token}</p>\n"
+    else:
+        return token, f"\n\n{token}\n\n"
+
+
+def _isolated(doc, format=None):
+    "Check that the conversion of doc (to format) does not depend on its neighbours"
+    types = import_types()
+    if format is not None and format.startswith("rst"):  # substitutions, targets
+        links = (types.Image, types.Link)
+    else:
+        links = ()
+    for elt in iter(doc):
+        if isinstance(elt, (types.Header, types.Cite, types.Note) + links):
+            return False
+        if isinstance(elt, types.OrderedList) and elt[0][1] == types.Example():
+            return False
+    return True
+
+
+# The sources with definitions (link references, footnotes, macros, targets,
+# labels, headers that may be referenced by their title, etc.) would change
+# the meaning of the other snippets in the batch.
+_latex_definitions = (
+    rb"\\(?:(?:re)?newcommand|providecommand|def|let|(?:re)?newenvironment"
+    rb"|DeclareMathOperator|label)\b"
+)
+_markdown_definitions = re.compile(
+    rb"^ {0,3}\[[^\]\n]+\]:"  # link references and notes
+    rb"|^ {0,3}#{1,6}(?:[ \t]|$)|^ {0,3}(?:=+|-+)[ \t]*$"  # ATX and setext headers
+    rb"|" + _latex_definitions,
+    re.MULTILINE,
+)
+_definitions = {
+    "commonmark": _markdown_definitions,
+    "commonmark_x": _markdown_definitions,
+    "gfm": _markdown_definitions,
+    "latex": re.compile(_latex_definitions),
+    "markdown": _markdown_definitions,
+    "markdown_mmd": _markdown_definitions,
+    "markdown_phpextra": _markdown_definitions,
+    "markdown_strict": _markdown_definitions,
+    "org": re.compile(rb"^\s*#\+(?:link|macro):", re.MULTILINE | re.IGNORECASE),
+    "rst": re.compile(  # directives, targets and section titles (adornments)
+        rb"^\s*(?:\.\.|__)(?:\s|$)|^([!-/:-@[-`{-~])\1+[ \t]*$", re.MULTILINE
+    ),
+}
+
+
+def _defines(source, format):
+    base_format = format.split("+")[0].split("-")[0]
+    definitions = _definitions.get(base_format)
+    return definitions is not None and definitions.search(source) is not None
+
+
+def read_batch(sources, format=None, options=None):
+    sources = [_read_args(source, None, format, options)[0] for source in sources]
+    if format is None:
+        format = "markdown"
+    if not _batchable(format, options, len(sources)):
+        return [read(source, format=format, options=options) for source in sources]
+
+    types = import_types()
+    docs = [None] * len(sources)
+    batch = [i for i, source in enumerate(sources) if not _defines(source, format)]
+    if len(batch) >= 2:
+        token, separator = _sentinel(format)
+        source = separator.encode("utf-8").join([sources[i] for i in batch])
+        doc = read(source, format=format)
+        sentinel = types.Para([types.Str(token)])
+        parts = [[]]
+        for block in doc[1]:
+            if block == sentinel:
+                parts.append([])
+            else:
+                parts[-1].append(block)
+        if len(parts) == len(batch) and not doc[0][0]:  # no interaction, metadata
+            for i, blocks in zip(batch, parts):
+                doc = types.Pandoc(types.Meta({}), blocks)
+                if _isolated(doc) and not _paragraph_ended(sources[i], format, doc):
+                    docs[i] = doc
+    for i, doc in enumerate(docs):
+        if doc is None:
+            docs[i] = read(sources[i], format=format)
+    return docs
+
+
+def _paragraph_ended(source, format, doc):
+    "Check if the last paragraph of doc was ended by the next snippet"
+    # In html, trailing inline content is a Plain block, unless a block follows.
+    types = import_types()
+    return (
+        format.startswith("html")
+        and doc[1] != []
+        and isinstance(doc[1][-1], types.Para)
+        and not source.rstrip().lower().endswith(b"</p>")
+    )
+
+
+def write_batch(docs, format=None, options=None):
+    if format is None:
+        format = "markdown"
+    if not _batchable(format, options, len(docs)):
+        return [write(doc, format=format, options=options) for doc in docs]
+
+    types = import_types()
+    docs = [_write_args(doc, None, format, options)[0] for doc in docs]
+    outputs = [None] * len(docs)
+    batch = [
+        i for i, doc in enumerate(docs) if not doc[0][0] and _isolated(doc, format)
+    ]
+    if len(batch) >= 2:
+        token, _ = _sentinel(format)
+        blocks = []
+        for j, i in enumerate(batch):
+            if j > 0:
+                blocks.append(types.Para([types.Str(token)]))
+            blocks.extend(docs[i][1])
+        output = write(types.Pandoc(types.Meta({}), blocks), format=format)
+        parts = re.split(r"^[^\n]*" + token + r"[^\n]*$", output, flags=re.M)
+        # The blocks are separated by a blank line (a newline in html): remove
+        # the end of the sentinel lines and the separators around them.
+        lead = "\n" if format.startswith("html") else "\n\n"
+        trail = lead[1:]
+        if len(parts) == len(batch):
+            for j, i in enumerate(batch):
+                part = parts[j]
+                if j > 0:
+                    if not part.startswith(lead):
+                        continue
+                    part = part[len(lead) :]
+                if j < len(batch) - 1:
+                    if not part.endswith("\n" + trail):
+                        continue
+                    part = part[: len(part) - len(trail)]
+                outputs[i] = part
+    for i, output in enumerate(outputs):
+        if output is None:
+            outputs[i] = write(docs[i], format=format)
+    return outputs
+
+
+class Batcher:
+    """Batch the snippet conversions requested by several threads
+
+    A batch (per kind of conversion and format) is converted as soon as it
+    contains `size` snippets, or `latency` seconds after its first snippet.
+    """
+
+    def __init__(self, size=100, latency=0.01):
+        self.size = size
+        self.latency = latency
+        self._lock = threading.Lock()
+        self._batches = {}
+
+    def read(self, source, format=None):
+        return self._submit(read_batch, source, format)
+
+    def write(self, doc, format=None):
+        return self._submit(write_batch, doc, format)
+
+    def flush(self):
+        "Convert the pending snippets now"
+        with self._lock:
+            batches = list(self._batches.items())
+            self._batches.clear()
+        for (function, format), batch in batches:
+            self._convert(function, format, batch)
+
+    def _submit(self, function, item, format):
+        key = (function, format)
+        future = concurrent.futures.Future()
+        with self._lock:
+            batch = self._batches.setdefault(key, [])
+            batch.append((item, future))
+            if len(batch) >= self.size:
+                del self._batches[key]
+            else:
+                if len(batch) == 1:
+                    timer = threading.Timer(self.latency, self._expire, [key, batch])
+                    timer.daemon = True
+                    timer.start()
+                batch = None
+        if batch is not None:  # full batch: convert it in this thread
+            self._convert(function, format, batch)
+        return future.result()
+
+    def _expire(self, key, batch):
+        with self._lock:
+            if self._batches.get(key) is not batch:  # already converted
+                return
+            del self._batches[key]
+        self._convert(*key, batch)
+
+    @staticmethod
+    def _convert(function, format, batch):
+        try:
+            results = function([item for item, _ in batch], format=format)
+        except Exception:  # convert the snippets one by one to isolate errors
+            for item, future in batch:
+                try:
+                    future.set_result(function([item], format=format)[0])
+                except Exception as error:
+                    future.set_exception(error)
+        else:
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+
+# Asyncio API
+# ------------------------------------------------------------------------------
+# The coroutines `aread` and `awrite` run pandoc as asyncio subprocesses,
+# while the JSON decoding or encoding of the documents is done in an executor
+# (the default executor of the event loop, unless specified), so that the
+# event loop is never blocked for long. The number of concurrent conversions
+# is bounded by a semaphore; by default, one per event loop.
+_async_semaphores = weakref.WeakKeyDictionary()
+
+
+def _async_semaphore():
+    loop = asyncio.get_running_loop()
+    semaphore = _async_semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _async_semaphores[loop] = asyncio.Semaphore(_DEFAULT_JOBS)
+    return semaphore
+
+
+async def aread(
+    source=None, file=None, format=None, options=None, executor=None, semaphore=None
+):
+    # The blocking work (file I/O, implicit configuration, cache, decoding)
+    # is done in the executor, never in the event loop.
+    loop = asyncio.get_running_loop()
+    source, format, options = await loop.run_in_executor(
+        executor, _read_args, source, file, format, options
+    )
+    if semaphore is None:
+        semaphore = _async_semaphore()
+    if format == "json":
+        output = source
+    else:
+        key = _cache_key("read", source, format, list(options))
+        output = None
+        if key:
+            output = await loop.run_in_executor(executor, cache.load_bytes, "read", key)
+        if output is None:
+            async with semaphore:
+                if not options and _configuration["server"] is not None:
+                    output = await loop.run_in_executor(
+                        executor, _server_convert, source, format, "json"
+                    )
+                if output is None:
+                    pandoc_options = ["-t", "json"] + list(options) + ["-f", format]
+                    output = await _arun_pandoc(pandoc_options, source)
+            if key:
+                await loop.run_in_executor(
+                    executor, cache.store_bytes, "read", key, output
+                )
+    decode = lambda output: _read_json(json.loads(output))
+    return await loop.run_in_executor(executor, decode, output)
+
+
+async def awrite(
+    doc, file=None, format=None, options=None, executor=None, semaphore=None
+):
+    loop = asyncio.get_running_loop()
+    doc, filename, format, options = await loop.run_in_executor(
+        executor, _write_args, doc, file, format, options
+    )
+    if semaphore is None:
+        semaphore = _async_semaphore()
+    input = await loop.run_in_executor(executor, _json_bytes, _json_writer(doc))
+
+    is_pdf = format == "pdf" or (filename is not None and filename.endswith(".pdf"))
+    key = None
+    if format != "json":
+        key = _cache_key("write", input, format, is_pdf, list(options))
+        output_bytes = None
+        if key:
+            output_bytes = await loop.run_in_executor(
+                executor, cache.load_bytes, "write", key
+            )
+        if output_bytes is not None:
+            return await loop.run_in_executor(
+                executor, _write_output, output_bytes, format, is_pdf, file
+            )
+
+    if format == "json":
+        output_bytes = input
+    elif not is_pdf:
+        async with semaphore:
+            output_bytes = None
+            if _server_writes(format, options):
+                output_bytes = await loop.run_in_executor(
+                    executor, _server_convert, input, "json", format
+                )
+            if output_bytes is None:
+                options = ["-t", format] + list(options) + ["-f", "json"]
+                output_bytes = await _arun_pandoc(options, input)
+    else:
+        async with semaphore:
+            with _pdf_output(format, options) as (options, output_path):
+                await _arun_pandoc(options, input)
+                output_bytes = await loop.run_in_executor(
+                    executor, pathlib.Path(output_path).read_bytes
+                )
+    if key:
+        await loop.run_in_executor(
+            executor, cache.store_bytes, "write", key, output_bytes
+        )
+    return await loop.run_in_executor(
+        executor, _write_output, output_bytes, format, is_pdf, file
+    )
+
+
+async def _arun_pandoc(options, input):
+    "Run pandoc as an asyncio subprocess, return its output (as bytes)"
+    if _configuration["path"] is None:
+        raise RuntimeError("this conversion requires the pandoc program")
+    args = [_configuration["path"]] + list(options)
+    process = await asyncio.create_subprocess_exec(
+        *args,
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    try:
+        stdout, stderr = await process.communicate(input)
+    except BaseException:  # e.g. cancellation: do not leave pandoc running
+        if process.returncode is None:
+            try:
+                process.kill()
+            except ProcessLookupError:
+                pass
+            await process.wait()
+        raise
+    if process.returncode != 0:
+        raise plumbum.ProcessExecutionError(
+            args,
+            process.returncode,
+            stdout.decode("utf-8", "replace"),
+            stderr.decode("utf-8", "replace"),
+        )
+    return stdout
+
+
 # JSON Reader v1
 # ------------------------------------------------------------------------------
 def read_json_v1(json_, type_=None):
@@ -482,202 +1316,754 @@ def write_json_v1(object_):
 
 # JSON Reader v2
 # ------------------------------------------------------------------------------
+# Instead of interpreting the type declarations (`_def`) at every node, we
+# compile them into a table of specialized decoders: one per named type, with
+# a precomputed dispatch on the "t" field for data types with several
+# constructors. The table is built on demand and is reset when the types are
+# created anew by `configure`.
+_json_decoders = {}
+
+
 def read_json_v2(json_, type_=None):
     types = import_types()
     if type_ is None:
-        type_ = types.Pandoc
-    if isinstance(type_, str):
-        type_ = getattr(types, type_)
-    if not isinstance(type_, list):  # not a type def (yet).
+        type_ = "Pandoc"
+    if isinstance(type_, type):
         if issubclass(type_, types.Type):
-            type_ = type_._def
+            type_ = type_.__name__
         else:  # primitive type
             return type_(json_)
+    if isinstance(type_, str):
+        decoder = _json_decoder(type_)
+    else:
+        decoder = _compile_json_decoder(type_)
+    return decoder(json_)
+
+
+def _json_decoder(name, compiling=None):
+    "Get the decoder of a named type (compile it if needed)"
+    decoders = _json_decoders
+    try:
+        return decoders[name]
+    except KeyError:
+        pass
+    if compiling is None:
+        compiling = set()
+    if name in compiling:  # recursive type: use a late-binding decoder
+        return lambda json_: decoders[name](json_)
+    compiling.add(name)
 
-    if type_[0] == "type":  # type alias
-        type_ = type_[1][1]
-        return read_json_v2(json_, type_)
-    if type_[0] == "list":
-        item_type = type_[1][0]
-        return [read_json_v2(item, item_type) for item in json_]
-    if type_[0] == "tuple":
-        tuple_types = type_[1]
-        return tuple(
-            read_json_v2(item, item_type)
-            for (item, item_type) in zip(json_, tuple_types)
-        )
-    if type_[0] == "map":
-        key_type, value_type = type_[1]
-        return types.map(
-            [
-                (read_json_v2(k, key_type), read_json_v2(v, value_type))
-                for (k, v) in json_.items()
-            ]
+    types = import_types()
+    type_ = getattr(types, name)
+    if not issubclass(type_, types.Type):  # primitive type
+        decoder = type_
+        if type_ is str and types._intern_table is not None:
+            decoder = _interning_decoder(None, decoder)
+    elif issubclass(type_, types.Constructor):
+        data_type = type_.__mro__[2]._def
+        single_type_constructor = len(data_type[1][1]) == 1
+        decoder = _compile_constructor_decoder(
+            type_._def, single_type_constructor, compiling
         )
-    if type_[0] == "maybe":
-        value_type = type_[1][0]
-        if json_ == None:
-            return None
-        else:
-            return read_json_v2(json_, value_type)
+    else:
+        decoder = _compile_json_decoder(type_._def, compiling)
+    if name in _interned_types and types._intern_table is not None:
+        decoder = _interning_decoder(name, decoder)
+    decoders[name] = decoder
+    compiling.remove(name)
+    return decoder
 
-    data_type = None
-    constructor = None
-    if type_[0] in ("data", "newtype"):
-        data_type = type_
-        constructors = data_type[1][1]
+
+# Values of these types are small, frequent and immutable; when interning is
+# enabled, the equal values are shared (see pandoc.types). The values that can
+# be modified in place (attributes, formats) are not shared, only their strings.
+_interned_types = ("Target",)
+
+
+def _frozen(json_):
+    if isinstance(json_, list):
+        return tuple([_frozen(item) for item in json_])
+    elif isinstance(json_, dict):
+        return tuple([(key, _frozen(value)) for key, value in json_.items()])
+    else:
+        return json_
+
+
+def _interning_decoder(name, decoder):
+    "Wrap a decoder to get the decoded values from the intern table"
+    types = import_types()
+    table = types._intern_table
+    get = table.get
+    max_size = types._intern_max_size
+
+    if name is None:  # strings are their own keys
+
+        def interning_decoder(json_):
+            value = get(json_)
+            if value is None:
+                if len(table) >= max_size:
+                    table.clear()
+                value = table[json_] = json_
+            return value
+
+    else:
+
+        def interning_decoder(json_):
+            key = (name, _frozen(json_))
+            value = get(key)
+            if value is None:
+                if len(table) >= max_size:
+                    table.clear()
+                value = table[key] = decoder(json_)
+            return value
+
+    return interning_decoder
+
+
+def _compile_json_decoder(type_, compiling=None):
+    "Compile the decoder of a type declaration"
+    if isinstance(type_, str):
+        return _json_decoder(type_, compiling)
+
+    kind = type_[0]
+    if kind == "type":  # type alias
+        return _compile_json_decoder(type_[1][1], compiling)
+    elif kind == "list":
+        item_decoder = _compile_json_decoder(type_[1][0], compiling)
+        return lambda json_: [item_decoder(item) for item in json_]
+    elif kind == "tuple":
+        item_decoders = [_compile_json_decoder(t, compiling) for t in type_[1]]
+        return lambda json_: tuple(
+            [decoder(item) for decoder, item in zip(item_decoders, json_)]
+        )
+    elif kind == "map":
+        key_type, value_type = type_[1]
+        key_decoder = _compile_json_decoder(key_type, compiling)
+        value_decoder = _compile_json_decoder(value_type, compiling)
+        return lambda json_: {
+            key_decoder(k): value_decoder(v) for k, v in json_.items()
+        }
+    elif kind == "maybe":
+        value_decoder = _compile_json_decoder(type_[1][0], compiling)
+        return lambda json_: None if json_ is None else value_decoder(json_)
+    elif kind in ("data", "newtype"):
+        constructors = type_[1][1]
         if len(constructors) == 1:
-            constructor = constructors[0]
-        else:
-            constructors = data_type[1][1]
-            constructors_names = [constructor[0] for constructor in constructors]
-            constructor_name = json_["t"]
-            if constructor_name not in constructors_names:  # shadowed
-                constructor_name = constructor_name + "_"
-                assert constructor_name in constructors_names
-            constructor = getattr(types, constructor_name)._def
-    elif type_[0][0] == type_[0][0].upper():
-        constructor = type_
-        constructor_type = getattr(types, constructor[0])
-        data_type = constructor_type.__mro__[2]._def
+            return _compile_constructor_decoder(constructors[0], True, compiling)
+        names = [constructor[0] for constructor in constructors]
+        dispatch = {}
+        for constructor in constructors:
+            name = constructor[0]
+            decoder = _compile_constructor_decoder(constructor, False, compiling)
+            dispatch[name] = decoder
+            # constructors shadowing their data type have a trailing underscore
+            if name.endswith("_") and name[:-1] not in names:
+                dispatch[name[:-1]] = decoder
+        return lambda json_: dispatch[json_["t"]](json_)
+    else:  # constructor
+        types = import_types()
+        data_type = getattr(types, type_[0]).__mro__[2]._def
+        single_type_constructor = len(data_type[1][1]) == 1
+        return _compile_constructor_decoder(type_, single_type_constructor, compiling)
 
-    single_type_constructor = len(data_type[1][1]) == 1
-    single_constructor_argument = len(constructor[1][1]) == 1
+
+def _compile_constructor_decoder(constructor, single_type_constructor, compiling):
+    types = import_types()
+    name = constructor[0]
+    C = getattr(types, name)
     is_record = constructor[1][0] == "map"
 
-    json_args = None
-    args = None
-    if constructor[0] == "Pandoc":
+    if name == "Pandoc":
         # TODO; check API version compat
-        meta = read_json_v2(json_["meta"], types.Meta)
-        blocks = read_json_v2(json_["blocks"], ["list", ["Block"]])
-        return types.Pandoc(meta, blocks)
-    elif constructor[0] == "Meta":
-        type_ = ["map", ["String", "MetaValue"]]
-        return types.Meta(read_json_v2(json_, type_))
-    elif not is_record:
-        if single_type_constructor:
-            json_args = json_
+        meta_decoder = _json_decoder("Meta", compiling)
+        blocks_decoder = _compile_json_decoder(["list", ["Block"]], compiling)
+        return lambda json_: C(
+            meta_decoder(json_["meta"]), blocks_decoder(json_["blocks"])
+        )
+    elif name == "Meta":
+        map_decoder = _compile_json_decoder(["map", ["String", "MetaValue"]], compiling)
+        return lambda json_: C(map_decoder(json_))
+    elif is_record:
+        keys = [k for k, t in constructor[1][1]]
+        decoders = [_compile_json_decoder(t, compiling) for k, t in constructor[1][1]]
+        items = list(zip(keys, decoders))
+        return lambda json_: C(*[decoder(json_[k]) for k, decoder in items])
+
+    decoders = [_compile_json_decoder(t, compiling) for t in constructor[1][1]]
+    if single_type_constructor:
+        if len(decoders) == 1:
+            decoder = decoders[0]
+            return lambda json_: C(decoder(json_))
         else:
-            json_args = json_.get("c", [])
-        if single_constructor_argument:
-            json_args = [json_args]
-        args = [read_json_v2(jarg, t) for jarg, t in zip(json_args, constructor[1][1])]
+            return lambda json_: C(
+                *[decoder(arg) for decoder, arg in zip(decoders, json_)]
+            )
     else:
-        keys = [k for k, t in constructor[1][1]]
-        types_ = [t for k, t in constructor[1][1]]
-        json_args = [json_[k] for k in keys]
-        args = [read_json_v2(jarg, t) for jarg, t in zip(json_args, types_)]
-    C = getattr(types, constructor[0])
-    return C(*args)
+        if len(decoders) == 0:
+            if types._flyweights:  # shared instance
+                instance = C()
+                return lambda json_: instance
+            return lambda json_: C()
+        elif len(decoders) == 1:
+            decoder = decoders[0]
+            return lambda json_: C(decoder(json_.get("c", [])))
+        else:
+            return lambda json_: C(
+                *[decoder(arg) for decoder, arg in zip(decoders, json_.get("c", []))]
+            )
 
 
 # JSON Writer v2
 # ------------------------------------------------------------------------------
+# The encoders of the constructors are compiled on demand from their type
+# declarations and stored in a table indexed by class (with the encoders of
+# the Python builtin types). This table is reset by `configure`, like the
+# table of decoders.
+_json_encoders = {}
+
+
 def write_json_v2(object_):
-    types = import_types()
+    import_types()
+    return _json_encode(object_)
 
-    odict = collections.OrderedDict
-    type_ = type(object_)
-    if not isinstance(object_, types.Type):
-        if isinstance(object_, (list, tuple)):
-            json_ = [write_json_v2(item) for item in object_]
-        elif isinstance(object_, dict):
-            json_ = odict((k, write_json_v2(v)) for k, v in object_.items())
+
+def _json_encode(object_):
+    try:
+        encoder = _json_encoders[type(object_)]
+    except KeyError:
+        encoder = _compile_json_encoder(type(object_))
+    return encoder(object_)
+
+
+def _compile_json_encoder(type_):
+    types = import_types()
+    encode = _json_encode
+
+    if issubclass(type_, types.Frozen):  # same encoder as the mutable type
+        encoder = _json_encoders.get(type_._thawed)
+        if encoder is None:
+            encoder = _compile_json_encoder(type_._thawed)
+    elif not issubclass(type_, types.Type):
+        if issubclass(type_, (list, tuple)):
+            encoder = lambda object_: [encode(item) for item in object_]
+        elif issubclass(type_, dict):
+            encoder = lambda object_: {k: encode(v) for k, v in object_.items()}
         else:  # primitive type (including None used by Maybes)
-            json_ = object_
-    elif isinstance(object_, types.Pandoc):
-        version = configure(read=True)["pandoc_types_version"]
-        metadata = object_[0]
-        blocks = object_[1]
-        json_ = odict()
-        json_["pandoc-api-version"] = [int(n) for n in version.split(".")]
-        json_["meta"] = write_json_v2(object_[0][0])
-        json_["blocks"] = write_json_v2(object_[1])
+            encoder = lambda object_: object_
+    elif issubclass(type_, types.Pandoc):
+        version = _configuration["pandoc_types_version"]
+        api_version = [int(n) for n in version.split(".")]
+
+        def encoder(object_):
+            meta, blocks = object_._args
+            return {
+                "pandoc-api-version": api_version.copy(),
+                "meta": encode(meta._arg0),
+                "blocks": encode(blocks),
+            }
+
     else:
-        constructor = type(object_)._def
-        data_type = type(object_).__mro__[2]._def
+        constructor = type_._def
+        data_type = type_.__mro__[2]._def
         single_type_constructor = len(data_type[1][1]) == 1
-        has_constructor_arguments = len(constructor[1][1]) >= 1
-        single_constructor_argument = len(constructor[1][1]) == 1
+        num_args = len(constructor[1][1])
         is_record = constructor[1][0] == "map"
-
-        json_ = odict()
-        if not single_type_constructor:
-            type_name = type(object_).__name__
-            # If an underscore was used to in the type name to avoid a name
-            # collision between a constructor and its parent, remove it for
-            # the json representation.
-            if type_name.endswith("_"):
-                type_name = type_name[:-1]
-            json_["t"] = type_name
-        if not is_record:
-            c = [write_json_v2(arg) for arg in object_]
-            if single_constructor_argument:
-                c = c[0]
+        # If an underscore was used to in the type name to avoid a name
+        # collision between a constructor and its parent, remove it for
+        # the json representation.
+        type_name = type_.__name__
+        if type_name.endswith("_"):
+            type_name = type_name[:-1]
+
+        if is_record:
+            keys = [kt[0] for kt in constructor[1][1]]
             if single_type_constructor:
-                json_ = c
+                encoder = lambda object_: {
+                    key: encode(arg) for key, arg in zip(keys, object_._args)
+                }
             else:
-                if has_constructor_arguments:
-                    json_["c"] = c
+
+                def encoder(object_):
+                    json_ = {"t": type_name}
+                    for key, arg in zip(keys, object_._args):
+                        json_[key] = encode(arg)
+                    return json_
+
+        elif single_type_constructor:
+            if num_args == 1:
+                encoder = lambda object_: encode(object_._arg0)
+            else:
+                encoder = lambda object_: [encode(arg) for arg in object_._args]
         else:
-            keys = [kt[0] for kt in constructor[1][1]]
-            for key, arg in zip(keys, object_):
-                json_[key] = write_json_v2(arg)
-    return json_
+            if num_args == 0:
+                encoder = lambda object_: {"t": type_name}
+            elif num_args == 1:
+                encoder = lambda object_: {
+                    "t": type_name,
+                    "c": encode(object_._arg0),
+                }
+            else:
+                encoder = lambda object_: {
+                    "t": type_name,
+                    "c": [encode(arg) for arg in object_._args],
+                }
 
+    _json_encoders[type_] = encoder
+    return encoder
 
-# Iteration
+
+# JSON Text Writer v2
 # ------------------------------------------------------------------------------
-def iter(elt, path=False):
-    if path is not False:
-        if not isinstance(path, list):  # e.g. path = True
-            path = []
+# Write the JSON text of a document to a binary file, chunk by chunk, instead
+# of building the JSON data of the whole document first. The block structure
+# of the document is walked in Python, while the remaining nodes (inlines,
+# attributes, etc.) are small enough to be encoded at once by `json.dumps`.
+# The output is identical to `json.dumps(write_json_v2(object_))`.
+_json_streamed = {}
+
+
+def dump_json_v2(object_, file):
+    FrozenList = import_types().FrozenList
+    encode = _json_encode
+    dumps = json.dumps
+    buffer = []
+    buffered = 0
+
+    def write(text):
+        nonlocal buffered
+        buffer.append(text)
+        buffered += len(text)
+        if buffered >= _CHUNK_SIZE:
+            flush()
+
+    def flush():
+        nonlocal buffered
+        file.write("".join(buffer).encode("utf-8"))
+        buffer.clear()
+        buffered = 0
+
+    def dump_items(items):
+        write("[")
+        for i, item in enumerate(items):
+            if i > 0:
+                write(", ")
+            dump(item)
+        write("]")
+
+    def dump(object_):
+        type_ = type(object_)
+        if type_ is list or type_ is tuple or type_ is FrozenList:
+            dump_items(object_)
+        elif _is_json_streamed(type_):
+            shape = _json_shape(type_)
+            if shape[0] == "Pandoc":
+                api_version, (meta, blocks) = shape[1], object_
+                write(f'{{"pandoc-api-version": {dumps(api_version)}, "meta": ')
+                write(dumps(encode(meta[0])))
+                write(', "blocks": ')
+                dump(blocks)
+                write("}")
+            elif shape[0] == "record":
+                type_name, keys = shape[1:]
+                write("{")
+                if type_name is not None:
+                    write(f'"t": {dumps(type_name)}, ')
+                for i, (key, arg) in enumerate(zip(keys, object_)):
+                    if i > 0:
+                        write(", ")
+                    write(f"{dumps(key)}: ")
+                    dump(arg)
+                write("}")
+            else:
+                type_name, num_args = shape[1:]
+                if type_name is not None:
+                    write(f'{{"t": {dumps(type_name)}')
+                    if num_args >= 1:
+                        write(', "c": ')
+                if num_args == 1:
+                    dump(object_[0])
+                elif type_name is None or num_args >= 1:
+                    dump_items(object_)
+                if type_name is not None:
+                    write("}")
+        else:
+            write(dumps(encode(object_)))
+
+    dump(object_)
+    flush()
 
-    args = [elt]
-    if path is not False:
-        args.append(path)
 
-    if path is False:
-        yield elt
+def _json_shape(type_):
+    "Describe the JSON representation of a constructor"
+    if issubclass(type_, import_types().Frozen):
+        type_ = type_._thawed
+    constructor = type_._def
+    if constructor[0] == "Pandoc":
+        version = _configuration["pandoc_types_version"]
+        return ("Pandoc", [int(n) for n in version.split(".")])
+    data_type = type_.__mro__[2]._def
+    if len(data_type[1][1]) == 1:  # single type constructor
+        type_name = None
+    else:
+        type_name = type_.__name__
+        if type_name.endswith("_"):
+            type_name = type_name[:-1]
+    if constructor[1][0] == "map":
+        keys = [kt[0] for kt in constructor[1][1]]
+        return ("record", type_name, keys)
     else:
-        yield elt, path
+        return ("args", type_name, len(constructor[1][1]))
 
-    if isinstance(elt, dict):
-        elt = elt.items()
-    if hasattr(elt, "__iter__") and not isinstance(elt, types.String):
-        for i, child in enumerate(elt):
+
+def _is_json_streamed(type_):
+    """Test if the instances of a type are walked by `dump_json_v2`
+
+    This is the case for the constructors of the pandoc types that can contain
+    blocks without the intermediate of an inline (such as a `Note`).
+    """
+    try:
+        return _json_streamed[type_]
+    except KeyError:
+        pass
+    types = import_types()
+    streamed = False
+    if issubclass(type_, types.Constructor) and not issubclass(type_, types.Inline):
+        names = set()
+        stack = [type_._def]
+        while stack:
+            decl = stack.pop()
+            for elt in iter(decl):
+                if isinstance(elt, str) and elt not in names:
+                    type__ = getattr(types, elt, None)
+                    if (
+                        isinstance(type__, type)
+                        and issubclass(type__, types.Type)
+                        and type__ is not types.Inline
+                    ):
+                        names.add(elt)
+                        stack.append(type__._def)
+        streamed = type_ is types.Pandoc or "Block" in names
+    _json_streamed[type_] = streamed
+    return streamed
+
+
+# Type Graph
+# ------------------------------------------------------------------------------
+# The type declarations tell which constructors may be found (at any depth)
+# in the arguments of each constructor; for example, an inline element may
+# only contain blocks through a note. This table (built on demand and reset by
+# `configure`) is used to skip the subtrees that cannot contain the elements
+# of interest during the tree iteration and transformation.
+_constructor_graph = {}
+_prunings = {}
+
+
+def _get_constructor_graph():
+    "Map each constructor to the constructors reachable from its arguments"
+    if _constructor_graph:
+        return _constructor_graph
+    types = import_types()
+
+    def arg_types(constructor):
+        kind, args = constructor._def[1]
+        return args if kind == "list" else [type_ for _, type_ in args]
+
+    def data_types(type_):  # the data types that a type declaration refers to
+        if isinstance(type_, str):
+            type_ = getattr(types, type_)
+            if not issubclass(type_, types.Type):  # primitive type
+                return set()
+            elif issubclass(type_, types.TypeDef):
+                return data_types(type_._def[1][1])
+            elif issubclass(type_, types.Constructor):
+                return {type_.__mro__[2]}
+            else:
+                return {type_}
+        else:  # list, tuple, map or maybe
+            return set().union(*[data_types(t) for t in type_[1]])
+
+    def constructors(data_type):
+        return [getattr(types, decl[0]) for decl in data_type._def[1][1]]
+
+    reachable_data_types = {}
+
+    def reach(data_type):
+        if data_type not in reachable_data_types:
+            reached, stack = set(), [data_type]
+            while stack:
+                data_type_ = stack.pop()
+                if data_type_ not in reached:
+                    reached.add(data_type_)
+                    for constructor in constructors(data_type_):
+                        for type_ in arg_types(constructor):
+                            stack.extend(data_types(type_))
+            reachable_data_types[data_type] = reached
+        return reachable_data_types[data_type]
+
+    graph = {}
+    for type_ in list(types._types_dict.values()):
+        if isinstance(type_, type) and issubclass(type_, types.Constructor):
+            graph[type_] = []
+            for arg_type in arg_types(type_):
+                reachable = set()
+                for data_type in data_types(arg_type):
+                    for data_type_ in reach(data_type):
+                        reachable.update(constructors(data_type_))
+                graph[type_].append(frozenset(reachable))
+    _constructor_graph.update(graph)
+    return _constructor_graph
+
+
+def _get_pruning(targets):
+    """Map each constructor to the arguments that may contain targets
+
+    Return None when targets are not all pandoc types (no pruning then).
+    """
+    types = import_types()
+    for target in targets:
+        if not (isinstance(target, type) and issubclass(target, types.Type)):
+            return None
+    try:
+        return _prunings[targets]
+    except KeyError:
+        pass
+    pruning = {}
+    for constructor, reachables in _get_constructor_graph().items():
+        pruning[constructor] = tuple(
+            any(issubclass(type_, targets) for type_ in reachable)
+            for reachable in reachables
+        )
+    _prunings[targets] = pruning
+    return pruning
+
+
+def _as_types(types):
+    "Normalize a class or an iterable of classes into a tuple of classes"
+    if isinstance(types, type):
+        return (types,)
+    return tuple(types)
+
+
+# Iteration
+# ------------------------------------------------------------------------------
+class Path:
+    """
+    Immutable sequence of (holder, index) pairs
+
+    Paths are linked lists that share their prefix with their parent path,
+    so that the iteration does not copy the path of every element.
+    They compare equal to the lists with the same items.
+    """
+
+    __slots__ = ["_parent", "_holder", "_index", "_length"]
+
+    def __new__(cls, items=()):
+        if isinstance(items, Path):
+            return items
+        path = _empty_path
+        for holder, index in items:
+            path = path._child(holder, index)
+        return path
+
+    def _child(self, holder, index):
+        path = object.__new__(Path)
+        path._parent = self
+        path._holder = holder
+        path._index = index
+        path._length = self._length + 1
+        return path
+
+    def _ancestor(self, length):  # the prefix of the path with this length
+        path = self
+        for _ in range(self._length - length):
+            path = path._parent
+        return path
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            start, stop, step = i.indices(self._length)
+            if start == 0 and step == 1:
+                return self._ancestor(max(stop, 0))
+            return Path(list(self)[i])
+        if i < 0:
+            i += self._length
+        if not 0 <= i < self._length:
+            raise IndexError("path index out of range")
+        path = self._ancestor(i + 1)
+        return (path._holder, path._index)
+
+    def __reversed__(self):
+        path = self
+        while path._length:
+            yield (path._holder, path._index)
+            path = path._parent
+
+    def __iter__(self):
+        items = list(reversed(self))
+        items.reverse()
+        return items.__iter__()
+
+    def __add__(self, other):
+        path = self
+        for holder, index in other:
+            path = path._child(holder, index)
+        return path
+
+    def __radd__(self, other):
+        return Path(other) + self
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if isinstance(other, (Path, list)):
+            return len(self) == len(other) and list(self) == list(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __bool__(self):
+        return self._length != 0
+
+    def copy(self):
+        return self
+
+    def __repr__(self):
+        return f"Path({list(self)!r})"
+
+
+_empty_path = object.__new__(Path)
+_empty_path._parent = None
+_empty_path._holder = None
+_empty_path._index = None
+_empty_path._length = 0
+
+
+def iter(elt, path=False, types=None):
+    if path is not False:
+        if path is True:
+            path = _empty_path
+        else:
+            path = Path(path)
+    if types is None:
+        return _iter(elt, path, None, None)
+    else:
+        types = _as_types(types)
+        return _iter(elt, path, types, _get_pruning(types))
+
+
+def _iter(elt, path, targets, pruning):
+    # Depth-first traversal with an explicit stack of children iterators
+    # (instead of nested generators), so that the document depth is not
+    # limited by the recursion limit and does not slow the iteration down.
+    new_path = object.__new__
+    stack = []
+    while True:
+        if targets is None or isinstance(elt, targets):
             if path is False:
-                child_path = False
+                yield elt
             else:
-                child_path = path.copy() + [(elt, i)]
-            for subelt in iter(child, path=child_path):
-                yield subelt
+                yield elt, path
+        mask = None
+        if pruning is not None:
+            mask = pruning.get(type(elt))
+        if isinstance(elt, dict):
+            stack.append((enumerate(elt.items()), elt, path, mask))
+        elif hasattr(elt, "__iter__") and not isinstance(elt, str):
+            stack.append((enumerate(elt), elt, path, mask))
+        while stack:
+            children, holder, holder_path, mask = stack[-1]
+            for i, elt in children:
+                if mask is None or mask[i]:
+                    break
+            else:  # no more children
+                stack.pop()
+                continue
+            if holder_path is False:
+                path = False
+            else:
+                path = new_path(Path)  # inlined holder_path._child(holder, i)
+                path._parent = holder_path
+                path._holder = holder
+                path._index = i
+                path._length = holder_path._length + 1
+            break
+        else:
+            return
 
 
 # Functional Transformation Patterns (Scrap-Your-Boilerplate-ish)
 # ------------------------------------------------------------------------------
-def _apply_children(f, elt):
-    types = import_types()
-    children = None
-    if isinstance(elt, types.Type):
-        children = elt[:]
-        new_children = [f(child) for child in children]
-        return type(elt)(*new_children)
-    elif isinstance(elt, dict):
-        children = elt.items()
-        return dict([f(child) for child in children])
-    elif hasattr(elt, "__iter__") and not isinstance(elt, types.String):
-        assert isinstance(elt, list) or isinstance(elt, tuple)
-        new_children = [f(child) for child in elt]
-        return type(elt)(new_children)
-    else:
-        assert type(elt) in [bool, int, float, str]
-        return elt
+# The unchanged subtrees are shared (not copied): the transformed document is
+# built from the original objects, except for the elements that were changed
+# and their ancestors. Thus, the transform f should not mutate its argument.
+def _apply(f, elt, pruning=None):
+    # Bottom-up transform with an explicit stack (instead of recursion), so
+    # that the document depth is not limited by the recursion limit. Every
+    # stack frame is [element, children, index of the current child, new
+    # children (None while they are all unchanged), pruning mask].
+    Type = import_types().Type
+    stack = []
+    while True:
+        if isinstance(elt, Type):
+            mask = pruning.get(type(elt)) if pruning is not None else None
+            stack.append([elt, elt._args, -1, None, mask])
+        elif isinstance(elt, dict):
+            stack.append([elt, list(elt.items()), -1, None, None])
+        elif isinstance(elt, list) or isinstance(elt, tuple):
+            stack.append([elt, elt, -1, None, None])
+        else:
+            assert elt is None or type(elt) in [bool, int, float, str]
+            elt = f(elt)
+        while stack:
+            frame = stack[-1]
+            holder, children, i, new_children, mask = frame
+            if i >= 0:  # elt is the transform of the i-th child
+                if new_children is not None:
+                    new_children.append(elt)
+                elif elt is not children[i]:
+                    new_children = frame[3] = list(children[:i])
+                    new_children.append(elt)
+            i += 1
+            while mask is not None and i < len(children) and not mask[i]:
+                if new_children is not None:  # no target in this child
+                    new_children.append(children[i])
+                i += 1
+            frame[2] = i
+            if i < len(children):
+                elt = children[i]
+                break
+            stack.pop()
+            if new_children is not None:
+                if isinstance(holder, Type):
+                    holder = type(holder)(*new_children)
+                elif isinstance(holder, dict):
+                    holder = dict(new_children)
+                else:
+                    holder = type(holder)(new_children)
+            elt = f(holder)
+        else:
+            return elt
 
 
 def apply(f, elt=None):  # apply the transform f bottom-up
-    f_ = f
+    pruning = None
+    if isinstance(f, dict):  # {type: transform}, only for the instances of type
+        transforms = [(_as_types(types), f) for types, f in f.items()]
+        pruning = _get_pruning(sum((types for types, _ in transforms), ()))
+
+        def f_(elt):
+            for types, f in transforms:
+                if isinstance(elt, types):
+                    new_elt = f(elt)
+                    if new_elt is not None:
+                        elt = new_elt
+            return elt
+
+    else:
+        f_ = f
 
     def f(elt):  # sugar : no return value means no change
         new_elt = f_(elt)
@@ -686,16 +2072,213 @@ def apply(f, elt=None):  # apply the transform f bottom-up
         else:
             return elt
 
-    def apply_(f, elt=None):
-        if elt is None:  # functional style / decorator
-            return lambda elt: apply_(f, elt)
+    def apply_(elt):
+        return _apply(f, elt, pruning)
+
+    if elt is None:  # functional style / decorator
+        return apply_
+    return apply_(elt)
+
+
+# Structural Equality
+# ------------------------------------------------------------------------------
+def equal(elt1, elt2, path=False):
+    """Test if elt1 == elt2 (without recursion)
+
+    With path=True, return a (equal, path) pair where path locates the first
+    difference in elt1, in document order (or is None if elt1 == elt2).
+    """
+    types = import_types()
+    difference = types._first_difference(elt1, elt2, _empty_path if path else False)
+    if path:
+        return difference is None, difference
+    else:
+        return difference is None
+
+
+# Frozen Documents
+# ------------------------------------------------------------------------------
+def freeze(elt):
+    "Return an immutable and hashable copy of elt"
+    types = import_types()
+
+    def freeze_(elt):
+        type_ = type(elt)
+        if type_ is list:
+            return types.FrozenList(elt)
+        elif type_ is dict:
+            return types.FrozenDict(elt)
+        elif issubclass(type_, types.Constructor) and not isinstance(elt, types.Frozen):
+            return types._frozen_type(type_)(*elt._args)
+        else:
+            return elt
 
-        def apply_descendants(elt):
-            return _apply_children(apply_(f), elt)
+    return _apply(freeze_, elt)
 
-        return f(apply_descendants(elt))
 
-    return apply_(f, elt)
+def thaw(elt):
+    "Return a mutable copy of a frozen elt"
+    types = import_types()
+
+    def thaw_(elt):
+        if isinstance(elt, types.Frozen):
+            return elt._thawed(*elt._args)
+        elif isinstance(elt, types.FrozenList):
+            return list(elt)
+        elif isinstance(elt, types.FrozenDict):
+            return dict(elt)
+        else:
+            return elt
+
+    return _apply(thaw_, elt)
+
+
+# Document Diff
+# ------------------------------------------------------------------------------
+# An edit script is a list of (operation, location, value) triples where the
+# operation is "insert", "delete" (with a value of None) or "replace" and the
+# location is a tuple of indices (the indices of a path, see `iter`). The lists
+# (of blocks, inlines, etc.) are processed from their end, so that the edits
+# can be applied in order: an edit does not change the location of the next
+# ones. The lists are aligned according to the hashes of their items, so that
+# the identical regions are skipped.
+def _structural_hashes(root):
+    "Map the id of every container in root to a hash of its contents"
+    types = import_types()
+    Constructor, Frozen = types.Constructor, types.Frozen
+    hashes = {}
+    containers = []  # parents before children
+    stack = [root]
+    while stack:
+        elt = stack.pop()
+        if isinstance(elt, Constructor):
+            children = elt._args
+        elif isinstance(elt, (list, tuple)):
+            children = elt
+        elif isinstance(elt, dict):
+            children = list(elt.values())
+        else:  # leaf
+            continue
+        if isinstance(elt, Frozen):  # cached hash
+            hashes[id(elt)] = hash(elt) or 1
+        else:
+            containers.append((elt, children))
+            stack.extend(children)
+    get = hashes.get
+    for elt, children in reversed(containers):
+        child_hashes = tuple([get(id(child)) or hash(child) for child in children])
+        if isinstance(elt, dict):
+            child_hashes = frozenset(zip(elt.keys(), child_hashes))
+        hashes[id(elt)] = hash((type(elt).__name__, child_hashes)) or 1  # not 0
+    return hashes
+
+
+def diff(old, new):
+    "Compute an edit script that turns the old document into the new one"
+    types = import_types()
+    Constructor, lists = types.Constructor, (list, types.FrozenList)
+    hashes = {}  # computed lazily, for the items of the lists to align
+
+    def hash_(elt):
+        try:
+            return hashes[id(elt)]
+        except KeyError:
+            hashes.update(_structural_hashes(elt))
+            return hashes.get(id(elt)) or hash(elt)
+
+    def same(elt1, elt2):
+        return elt1 is elt2 or elt1 == elt2
+
+    def similar(elt1, elt2):  # diffed recursively rather than replaced
+        return (isinstance(elt1, lists) and isinstance(elt2, lists)) or (
+            isinstance(elt1, Constructor) and type(elt1) is type(elt2)
+        )
+
+    # The tasks are either edits (tuples) or pairs of elements to diff (lists)
+    def diff_pair(old, new, location):
+        if isinstance(old, lists):
+            return diff_lists(old, new, location)
+        tasks = []
+        for i in reversed(range(len(old))):
+            old_arg, new_arg = old[i], new[i]
+            if same(old_arg, new_arg):
+                continue
+            elif similar(old_arg, new_arg):
+                tasks.append([old_arg, new_arg, location + (i,)])
+            else:  # leaf change: replace the element as a whole
+                return [("replace", location, new)]
+        return tasks
+
+    def diff_lists(old, new, location):
+        start, old_end, new_end = 0, len(old), len(new)
+        while start < min(old_end, new_end) and same(old[start], new[start]):
+            start += 1
+        while (
+            old_end > start
+            and new_end > start
+            and same(old[old_end - 1], new[new_end - 1])
+        ):
+            old_end -= 1
+            new_end -= 1
+        old_hashes = [hash_(elt) for elt in old[start:old_end]]
+        new_hashes = [hash_(elt) for elt in new[start:new_end]]
+        matcher = difflib.SequenceMatcher(None, old_hashes, new_hashes, False)
+        tasks = []  # from the end of the list
+        for tag, i1, i2, j1, j2 in reversed(matcher.get_opcodes()):
+            i1, i2, j1, j2 = i1 + start, i2 + start, j1 + start, j2 + start
+            if tag == "equal":
+                for i, j in reversed(list(zip(range(i1, i2), range(j1, j2)))):
+                    if not same(old[i], new[j]):  # hash collision
+                        tasks.append(("replace", location + (i,), new[j]))
+                continue
+            n = min(i2 - i1, j2 - j1)  # the number of replaced items
+            for i in reversed(range(i1 + n, i2)):
+                tasks.append(("delete", location + (i,), None))
+            for j in reversed(range(j1 + n, j2)):
+                tasks.append(("insert", location + (i1 + n,), new[j]))
+            for k in reversed(range(n)):
+                old_item, new_item = old[i1 + k], new[j1 + k]
+                if similar(old_item, new_item):
+                    tasks.append([old_item, new_item, location + (i1 + k,)])
+                else:
+                    tasks.append(("replace", location + (i1 + k,), new_item))
+        return tasks
+
+    script = []
+    if same(old, new):
+        stack = []
+    elif similar(old, new):
+        stack = [[old, new, ()]]
+    else:
+        stack = [("replace", (), new)]
+    while stack:  # depth-first
+        task = stack.pop()
+        if isinstance(task, tuple):
+            script.append(task)
+        else:
+            stack.extend(reversed(diff_pair(*task)))
+    return script
+
+
+def patch(doc, script):
+    "Apply an edit script (see `diff`) to doc, in place; return the new doc"
+    for operation, location, value in script:
+        if location == ():  # only a replacement of the document itself
+            doc = value
+            continue
+        holder = doc
+        for index in location[:-1]:
+            holder = holder[index]
+        index = location[-1]
+        if operation == "replace":
+            holder[index] = value
+        elif operation == "insert":
+            holder.insert(index, value)
+        elif operation == "delete":
+            del holder[index]
+        else:
+            raise ValueError(f"unknown edit operation {operation!r}")
+    return doc
 
 
 # Main Entry Point
@@ -763,4 +2346,4 @@ def main():
             output = sys.stdout.buffer
         else:
             output = args.output
-        write(doc, file=output, format=args.format)
+        write(doc, file=output, format=args.format, stream=True)
@@ -0,0 +1,303 @@
+# coding: utf-8
+
+# Python Standard Library
+import collections
+import json
+import os
+import pathlib
+import shutil
+import tempfile
+import threading
+
+# Pandoc
+import pandoc.about
+
+
+# Cache Directory
+# ------------------------------------------------------------------------------
+# The cache is stored in the user cache directory, unless the environment
+# variable PANDOC_PYTHON_CACHE is set. In this case, its value is used as the
+# cache directory; an empty value disables the (disk) cache altogether.
+def get_directory():
+    path = os.environ.get("PANDOC_PYTHON_CACHE")
+    if path is None:
+        root = os.environ.get("XDG_CACHE_HOME")
+        if not root:
+            root = os.path.join(os.path.expanduser("~"), ".cache")
+        path = os.path.join(root, "pandoc-python")
+    if path == "":
+        return None
+    return pathlib.Path(path) / pandoc.about.version
+
+
+# Cache Kinds & Statistics
+# ------------------------------------------------------------------------------
+# Each kind of cached data can be enabled or disabled independently:
+#
+#   - "definitions": the parsed pandoc-types declarations (enabled),
+#
+#   - "executable": the version of the pandoc executable (disabled),
+#
+#   - "read": the output of pandoc for the documents read (disabled),
+#
+#   - "write": the output of pandoc for the documents written (disabled).
+#
+# The size of the kinds with potentially large entries is bounded: the least
+# recently used entries are deleted when the cache is full. The "write" kind
+# also has a (bounded) in-memory tier in front of the disk; it is used even
+# when the disk cache is disabled.
+_enabled = {
+    "definitions": True,
+    "executable": False,
+    "read": False,
+    "write": False,
+}
+
+_max_sizes = {
+    "read": 256 * 2**20,
+    "write": 256 * 2**20,
+}
+
+_memory_max_sizes = {
+    "write": 64 * 2**20,
+}
+
+_stats = collections.defaultdict(collections.Counter)
+
+_sizes = {}  # estimated size of the cache entries (for bounded kinds)
+
+_memory = collections.defaultdict(collections.OrderedDict)  # in LRU order
+_memory_sizes = collections.Counter()
+_memory_lock = threading.Lock()
+
+
+def _check_kinds(kinds):
+    for kind in kinds:
+        if kind not in _enabled:
+            raise ValueError(f"unknown cache kind {kind!r}")
+    return kinds or tuple(_enabled)
+
+
+def enable(*kinds):
+    for kind in _check_kinds(kinds):
+        _enabled[kind] = True
+
+
+def disable(*kinds):
+    for kind in _check_kinds(kinds):
+        _enabled[kind] = False
+
+
+def is_enabled(kind):
+    if kind in _memory_max_sizes:
+        return _enabled[kind]
+    return _enabled[kind] and get_directory() is not None
+
+
+def set_max_size(kind, size):
+    "Set the maximal size (in bytes) of the cache entries of a kind"
+    if kind not in _max_sizes:
+        raise ValueError(f"the size of the {kind!r} cache cannot be bounded")
+    _max_sizes[kind] = size
+    _sizes.pop(kind, None)
+    if is_enabled(kind):
+        _bound(kind)
+
+
+def set_memory_max_size(kind, size):
+    "Set the maximal size (in bytes) of the in-memory entries of a kind"
+    if kind not in _memory_max_sizes:
+        raise ValueError(f"the {kind!r} cache has no in-memory entries")
+    _memory_max_sizes[kind] = size
+    with _memory_lock:
+        _trim_memory(kind)
+
+
+def info():
+    "Return the cache settings and hit/miss counters"
+    infos = {}
+    for kind in _enabled:
+        infos[kind] = {
+            "enabled": is_enabled(kind),
+            "hits": _stats[kind]["hits"],
+            "misses": _stats[kind]["misses"],
+        }
+        if kind in _max_sizes:
+            infos[kind]["size"] = sum(size for _, size, _ in _entries(kind))
+            infos[kind]["max_size"] = _max_sizes[kind]
+        if kind in _memory_max_sizes:
+            infos[kind]["memory_size"] = _memory_sizes[kind]
+            infos[kind]["memory_max_size"] = _memory_max_sizes[kind]
+    return infos
+
+
+def clear(*kinds):
+    "Delete the cache entries (and reset the counters)"
+    directory = get_directory()
+    for kind in _check_kinds(kinds):
+        if directory is not None:
+            shutil.rmtree(directory / kind, ignore_errors=True)
+        _stats[kind].clear()
+        _sizes.pop(kind, None)
+        with _memory_lock:
+            _memory.pop(kind, None)
+            _memory_sizes.pop(kind, None)
+
+
+# JSON Entries
+# ------------------------------------------------------------------------------
+# The cache is a best-effort mechanism: a missing, corrupted or unwritable
+# cache entry is never an error, the value is merely recomputed.
+def load(kind, key):
+    if not is_enabled(kind):
+        return None
+    path = get_directory() / kind / (key + ".json")
+    try:
+        with open(path, encoding="utf-8") as file:
+            value = json.load(file)
+    except (OSError, ValueError):
+        _stats[kind]["misses"] += 1
+        return None
+    _stats[kind]["hits"] += 1
+    return value
+
+
+def store(kind, key, value):
+    if not is_enabled(kind):
+        return
+    path = get_directory() / kind / (key + ".json")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # write then rename, so that concurrent readers never see partial data
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as file:
+                json.dump(value, file)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+    except OSError:
+        pass
+
+
+# Binary Entries
+# ------------------------------------------------------------------------------
+# The modification time of these entries is updated when they are used, so
+# that the least recently used ones can be deleted first.
+def load_bytes(kind, key):
+    if not is_enabled(kind):
+        return None
+    if kind in _memory_max_sizes:
+        with _memory_lock:
+            value = _memory[kind].get(key)
+            if value is not None:
+                _memory[kind].move_to_end(key)
+                _stats[kind]["hits"] += 1
+                return value
+    directory = get_directory()
+    if directory is None:
+        _stats[kind]["misses"] += 1
+        return None
+    path = directory / kind / key
+    try:
+        with open(path, "rb") as file:
+            value = file.read()
+        os.utime(path)
+    except OSError:
+        _stats[kind]["misses"] += 1
+        return None
+    _stats[kind]["hits"] += 1
+    _remember(kind, key, value)
+    return value
+
+
+def store_bytes(kind, key, value):
+    if not is_enabled(kind):
+        return
+    _remember(kind, key, value)
+    directory = get_directory()
+    if directory is None:
+        return
+    path = directory / kind / key
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(value)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+    except OSError:
+        return
+    if kind in _sizes:
+        _sizes[kind] += len(value)
+    _bound(kind)
+
+
+def _remember(kind, key, value):
+    "Store an entry in memory, if the kind has an in-memory tier"
+    if kind not in _memory_max_sizes:
+        return
+    with _memory_lock:
+        entries = _memory[kind]
+        old_value = entries.pop(key, None)
+        if old_value is not None:
+            _memory_sizes[kind] -= len(old_value)
+        entries[key] = value
+        _memory_sizes[kind] += len(value)
+        _trim_memory(kind)
+
+
+def _trim_memory(kind):
+    entries = _memory[kind]
+    while _memory_sizes[kind] > _memory_max_sizes[kind]:
+        _, value = entries.popitem(last=False)
+        _memory_sizes[kind] -= len(value)
+
+
+def _entries(kind):
+    "Return the (mtime, size, path) of the cache entries of a kind"
+    directory = get_directory()
+    entries = []
+    if directory is None:
+        return entries
+    try:
+        with os.scandir(directory / kind) as dir_entries:
+            for entry in dir_entries:
+                if entry.name.endswith(".tmp"):  # being written
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+    except OSError:
+        pass
+    return entries
+
+
+def _bound(kind):
+    """Delete the least recently used entries if the cache is full
+
+    The cache directory is only scanned when the estimated size exceeds the
+    bound; then it is reduced to 3/4 of the bound.
+    """
+    max_size = _max_sizes[kind]
+    if _sizes.get(kind, max_size + 1) <= max_size:
+        return
+    entries = _entries(kind)
+    size = sum(entry_size for _, entry_size, _ in entries)
+    if size > max_size:
+        entries.sort()
+        for _, entry_size, path in entries:
+            if size <= max_size * 3 // 4:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            size -= entry_size
+    _sizes[kind] = size
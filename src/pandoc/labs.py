@@ -149,7 +149,7 @@ def not_(predicate):
 # Queries & Results
 # ------------------------------------------------------------------------------
 def query(root):
-    return Query([(root, [])])
+    return Query([(root, pandoc.Path())])
 
 
 def _getitem(sequence, indices):
@@ -219,11 +219,11 @@ class Query:
         for elt, path in self._elts:
             if isinstance(elt, dict):
                 for i, child in enumerate(elt.items()):
-                    child_path = path.copy() + [(elt, i)]
+                    child_path = path + [(elt, i)]
                     results.append((child, child_path))
             elif hasattr(elt, "__iter__") and not isinstance(elt, str):
                 for i, child in enumerate(elt):
-                    child_path = path.copy() + [(elt, i)]
+                    child_path = path + [(elt, i)]
                     results.append((child, child_path))
         return Query(results)
 
@@ -245,14 +245,14 @@ class Query:
                     if i < 0:
                         i += len(elt)
                     child = children[i]
-                    results.append((child, elt_path.copy() + [(elt, i)]))
+                    results.append((child, elt_path + [(elt, i)]))
                 except IndexError:
                     pass
             elif isinstance(i, slice):
                 indices = range(len(children))[i]
                 for index in indices:
                     child = children[index]
-                    results.append((child, elt_path.copy() + [(elt, index)]))
+                    results.append((child, elt_path + [(elt, index)]))
         return Query(results)
 
     def get_parent(self):
@@ -324,9 +324,7 @@ class Query:
         for (parent_elt, parent_path), index in zip(self.parent._elts, indices):
             try:  # 🚧 TODO: adaptation of [] for dicts and strings (use _getitem).
                 next_element = parent_elt[index + 1]
-                results.append(
-                    (next_element, parent_path.copy() + [(parent_elt, index + 1)])
-                )
+                results.append((next_element, parent_path + [(parent_elt, index + 1)]))
             except IndexError:
                 pass
         return Query(results)
@@ -341,7 +339,7 @@ class Query:
                 try:  # 🚧 TODO: adaptation of [] for dicts and strings (& factor out).
                     next_element = parent_elt[index - 1]
                     results.append(
-                        (next_element, parent_path.copy() + [(parent_elt, index - 1)])
+                        (next_element, parent_path + [(parent_elt, index - 1)])
                     )
                 except IndexError:
                     pass
@@ -1,4 +1,7 @@
 # coding: utf-8
+import itertools
+import operator
+
 import pandoc
 import pandoc.utils
 
@@ -20,34 +23,64 @@ class MetaType(type):
             return type.__repr__(cls)
 
 
-Type = MetaType("Type", (object,), {"__init__": _fail_init})
+Type = MetaType("Type", (object,), {"__init__": _fail_init, "__slots__": ()})
 
 
 class Data(Type):
-    pass
+    __slots__ = ()
 
 
+# The constructor arguments are stored in the slots _arg0, _arg1, etc. (there is
+# no instance dict); the _args property gets them all as a tuple. The names of
+# these slots are also the __match_args__ used by the pattern matching.
 class Constructor(Data):
-    def __init__(self, *args):
-        if type(self) is Constructor:
-            _fail_init(self, *args)
-        else:
-            self._args = list(args)
+    __slots__ = ()
+    __match_args__ = ()
+    _args = ()
+
+    __init__ = _fail_init  # the constructors have their own __init__
 
     def __iter__(self):
         return iter(self._args)
 
+    def _slot(self, key):
+        try:
+            return self.__match_args__[key]
+        except IndexError:  # same error as the list of arguments
+            raise IndexError("list index out of range") from None
+
     def __getitem__(self, key):
-        return self._args[key]
+        if isinstance(key, slice):
+            return list(self._args[key])
+        return getattr(self, self._slot(key))
 
     def __setitem__(self, key, value):
-        self._args[key] = value
+        if isinstance(key, slice):
+            args = list(self._args)
+            args[key] = value
+            if len(args) != len(self.__match_args__):
+                error = "{type} has a fixed number of arguments ({n})"
+                error = error.format(
+                    type=type(self).__name__, n=len(self.__match_args__)
+                )
+                raise ValueError(error)
+            for name, arg in zip(self.__match_args__, args):
+                setattr(self, name, arg)
+        else:
+            setattr(self, self._slot(key), value)
 
     def __len__(self):
-        return len(self._args)
+        return len(self.__match_args__)
 
     def __eq__(self, other):
-        return type(self) == type(other) and self[:] == other[:]
+        if self is other:
+            return True
+        if type(self) is not type(other):
+            return False
+        try:
+            return self._args == other._args
+        except RecursionError:  # deep document
+            return _first_difference(self, other) is None
 
     def __neq__(self, other):
         return not (self == other)
@@ -61,7 +94,186 @@ class Constructor(Data):
 
 
 class TypeDef(Type):
-    pass
+    __slots__ = ()
+
+
+# Structural Equality
+# ------------------------------------------------------------------------------
+def _first_difference(elt1, elt2, path=False):
+    """Compare elt1 and elt2 (like ==) with an explicit stack
+
+    Return None if they are equal; otherwise, return the path to their first
+    difference in elt1 (in document order) if a path is given, else False.
+    """
+    stack = [(elt1, elt2, path)]
+    while stack:
+        elt1, elt2, path = stack.pop()
+        if elt1 is elt2:
+            continue
+        if isinstance(elt1, Constructor):
+            if type(elt1) is not type(elt2):
+                return path
+            if isinstance(elt1, Frozen) and hash(elt1) != hash(elt2):
+                return path
+            children1, children2 = elt1._args, elt2._args
+        elif isinstance(elt1, list) or isinstance(elt1, tuple):
+            sequence_type = list if isinstance(elt1, list) else tuple
+            if not isinstance(elt2, sequence_type) or len(elt1) != len(elt2):
+                return path
+            children1, children2 = elt1, elt2
+        elif isinstance(elt1, dict):
+            if not isinstance(elt2, dict) or len(elt1) != len(elt2):
+                return path
+            if any(key not in elt2 for key in elt1):
+                return path
+            children1 = list(elt1.items())
+            children2 = [(key, elt2[key]) for key in elt1]
+        else:
+            if not (elt1 == elt2):
+                return path
+            continue
+        if path is False:
+            stack.extend(
+                zip(reversed(children1), reversed(children2), itertools.repeat(False))
+            )
+        else:
+            for i in range(len(children1) - 1, -1, -1):
+                stack.append((children1[i], children2[i], path._child(elt1, i)))
+    return None
+
+
+# Flyweights
+# ------------------------------------------------------------------------------
+# When enabled, the constructors without arguments (Space, SoftBreak, etc.)
+# return a shared instance instead of a new one. These instances have no state
+# (no slots, no instance dict) and cannot be mutated.
+_flyweights = False
+
+
+def _new_nullary(cls, *args):
+    if _flyweights:
+        return cls._instance
+    return object.__new__(cls)
+
+
+def enable_flyweights():
+    global _flyweights
+    _flyweights = True
+    pandoc._json_decoders.clear()
+
+
+def disable_flyweights():
+    global _flyweights
+    _flyweights = False
+    pandoc._json_decoders.clear()
+
+
+# Interning
+# ------------------------------------------------------------------------------
+# When enabled, the JSON readers share the equal strings and the equal link
+# targets (pairs of strings) that they decode; the mutable values are never
+# shared. The intern table is cleared when it reaches its maximum size (its
+# number of entries).
+_intern_table = None
+_intern_max_size = 65536
+
+
+def enable_interning(max_size=65536):
+    global _intern_table, _intern_max_size
+    _intern_table = {}
+    _intern_max_size = max_size
+    pandoc._json_decoders.clear()
+
+
+def disable_interning():
+    global _intern_table
+    _intern_table = None
+    pandoc._json_decoders.clear()
+
+
+# Frozen Types
+# ------------------------------------------------------------------------------
+# The frozen constructors (see pandoc.freeze) are immutable and hashable
+# subclasses of the constructors, created on demand. Their (Merkle-style) hash
+# depends on the hashes of their arguments and is cached.
+class Frozen:
+    __slots__ = ()
+
+    def __setitem__(self, key, value):
+        raise TypeError(f"{type(self).__name__} is frozen")
+
+    def __hash__(self):
+        try:
+            return self._hash
+        except AttributeError:
+            _compute_hashes(self)
+            return self._hash
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if type(self) is not type(other) or hash(self) != hash(other):
+            return False
+        try:
+            return self._args == other._args
+        except RecursionError:  # deep document
+            return _first_difference(self, other) is None
+
+    def __reduce__(self):
+        return (pandoc.freeze, (pandoc.thaw(self),))
+
+
+class FrozenList(tuple):
+    __slots__ = ()
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+def _fail_frozen(self, *args, **kwargs):
+    raise TypeError("FrozenDict is frozen")
+
+
+class FrozenDict(dict):
+    __slots__ = ()
+    __setitem__ = __delitem__ = __ior__ = _fail_frozen
+    clear = pop = popitem = setdefault = update = _fail_frozen
+
+    def __hash__(self):
+        return hash(frozenset(self.items()))
+
+
+def _compute_hashes(root):
+    "Compute the missing hashes of the frozen elements in root (bottom-up)"
+    elts, stack = [], [root]
+    while stack:
+        elt = stack.pop()
+        if isinstance(elt, Frozen):
+            if not hasattr(elt, "_hash"):
+                elts.append(elt)
+                stack.extend(elt._args)
+        elif isinstance(elt, tuple):
+            stack.extend(elt)
+        elif isinstance(elt, dict):
+            stack.extend(elt.values())
+    for elt in reversed(elts):  # children first
+        elt._hash = hash((type(elt).__name__, elt._args))
+
+
+_frozen_types = {}
+
+
+def _frozen_type(type_):
+    try:
+        return _frozen_types[type_]
+    except KeyError:
+        pass
+    _dict = {"__slots__": ("_hash",), "_thawed": type_, "__doc__": type_.__doc__}
+    frozen_type = type(type_.__name__, (Frozen, type_), _dict)
+    if not type_.__match_args__:  # shared instance
+        frozen_type._instance = object.__new__(frozen_type)
+    _frozen_types[type_] = frozen_type
+    return frozen_type
 
 
 # Pandoc Types
@@ -83,12 +295,33 @@ def _make_builtin_types():
     td["map"] = dict
 
 
+def _make_init(num_args):
+    "Make a constructor __init__ that stores its arguments in the slots"
+    params = "".join(f", arg{i}" for i in range(num_args))
+    body = "".join(f"\n    self._arg{i} = arg{i}" for i in range(num_args))
+    namespace = {}
+    exec(f"def __init__(self{params}):{body or ' pass'}", namespace)
+    return namespace["__init__"]
+
+
+def enable_slots(class_dict):
+    decl = class_dict["_def"]
+    num_args = len(decl[1][1])
+    names = tuple([f"_arg{i}" for i in range(num_args)])
+    class_dict["__slots__"] = names
+    class_dict["__init__"] = _make_init(num_args)
+    if num_args == 1:
+        getter = operator.attrgetter(names[0])
+        class_dict["_args"] = property(lambda self: (getter(self),))
+    elif num_args > 1:
+        class_dict["_args"] = property(operator.attrgetter(*names))
+
+
 def enable_pattern_matching(class_dict):
     decl = class_dict["_def"]
     num_args = len(decl[1][1])
+    # the arguments are available as the _arg0, _arg1, etc. slots
     class_dict["__match_args__"] = tuple([f"_arg{i}" for i in range(num_args)])
-    for i in range(num_args):
-        class_dict[f"_arg{i}"] = property(lambda self, i=i: self._args[i])
 
 
 def clear_types():
@@ -100,6 +333,7 @@ def clear_types():
     for type_name in _types_dict:
         del globs[type_name]
     _types_dict = {}
+    _frozen_types.clear()
 
 
 def make_types():
@@ -117,12 +351,8 @@ def make_types():
     # Create builtin types
     _make_builtin_types()
 
-    # Load & parse the types definition
-    defs_src = pandoc.utils.definitions[version]
-    if not isinstance(defs_src, str):  # resource loaded as bytes in Python 3
-        defs_src = defs_src.decode("utf-8")
-
-    defs = pandoc.utils.parse(defs_src)
+    # Load & parse the types definition (or get them from the cache)
+    defs = pandoc.utils.load_definitions(version)
 
     # Create the types
     for decl in defs:
@@ -143,7 +373,11 @@ def make_types():
                     if constructor_name == type_name:
                         constructor[0] = constructor_name + "_"
 
-            _dict = {"_def": decl, "__doc__": pandoc.utils.docstring(decl)}
+            _dict = {
+                "_def": decl,
+                "__doc__": pandoc.utils.docstring(decl),
+                "__slots__": (),
+            }
             data_type = type(type_name, (Data,), _dict)
             _types_dict[type_name] = data_type
             for constructor in constructors:
@@ -153,8 +387,14 @@ def make_types():
                     "_def": constructor,
                     "__doc__": pandoc.utils.docstring(constructor),
                 }
+                enable_slots(_dict)
                 enable_pattern_matching(_dict)
+                if not _dict["__slots__"]:
+                    _dict["__new__"] = _new_nullary
                 type_ = type(constructor_name, bases, _dict)
+                type_.__init__.__qualname__ = f"{constructor_name}.__init__"
+                if not type_.__slots__:
+                    type_._instance = object.__new__(type_)
                 _types_dict[constructor_name] = type_
         elif decl_type == "type":
             _dict = {"_def": decl, "__doc__": pandoc.utils.docstring(decl)}
@@ -1,5 +1,6 @@
 # Python Standard Library
 import json
+import sys
 import warnings
 
 # Third-Party Libraries
@@ -7,15 +8,35 @@ import importlib.resources as resources
 import ply.lex as lex
 import ply.yacc as yacc
 
+# Pandoc
+import pandoc.cache
+
 
 # Pandoc-Types Version Mapping and Type Info
 # ------------------------------------------------------------------------------
-_json_data = resources.read_text("pandoc", "pandoc-types.js")
-if not isinstance(_json_data, str):  # resource loaded as bytes in Python 3
-    _json_data = _json_data.decode("utf-8")
-_data = json.loads(_json_data)
-version_mapping = _data["version_mapping"]
-definitions = _data["definitions"]
+# This data is loaded on first use: most processes only need the definitions
+# of a single version of pandoc-types and often find them in the cache.
+_data = None
+
+
+def _load_data():
+    global _data
+    if _data is None:
+        _json_data = resources.read_text("pandoc", "pandoc-types.js")
+        if not isinstance(_json_data, str):  # resource loaded as bytes in Python 3
+            _json_data = _json_data.decode("utf-8")
+        _data = json.loads(_json_data)
+    return _data
+
+
+def __getattr__(name):  # lazy module attributes
+    if name in ("version_mapping", "definitions"):
+        return _load_data()[name]
+    elif name in ("lexer", "parser"):
+        get_parser()
+        return globals()["_" + name]
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 # Pandoc-Types Version Resolver
@@ -50,6 +71,8 @@ def match(spec, version):
 
 
 def resolve(version, warn=True):
+    version_mapping = _load_data()["version_mapping"]
+    definitions = _load_data()["definitions"]
     pandoc_versions = sorted(version_mapping.keys(), key=version_key)
     latest_pandoc_version = pandoc_versions[-1]
     pandoc_types_versions = sorted(definitions.keys(), key=version_key)
@@ -129,8 +152,6 @@ def t_error(t):
     t.lexer.skip(1)
 
 
-lexer = lex.lex()
-
 # Parser
 # ------------------------------------------------------------------------------
 def p_typedecl(p):
@@ -267,7 +288,19 @@ def p_error(p):
     print("Syntax error in input.")
 
 
-parser = yacc.yacc(debug=0, write_tables=0)
+# The lexer and parser are built on first use (which may never happen when the
+# type declarations are cached), since building the grammar tables is costly.
+_lexer = None
+_parser = None
+
+
+def get_parser():
+    global _lexer, _parser
+    if _parser is None:
+        module = sys.modules[__name__]
+        _lexer = lex.lex(module=module)
+        _parser = yacc.yacc(module=module, debug=0, write_tables=0)
+    return _parser
 
 
 # Type Declarations
@@ -290,7 +323,20 @@ def split(src):
 def parse(src):
     if not isinstance(src, str):  # unicode in Python 2
         src = str(src)
-    return [parser.parse(type_decl) for type_decl in split(src)]
+    parser = get_parser()
+    return [parser.parse(type_decl, lexer=_lexer) for type_decl in split(src)]
+
+
+def load_definitions(version):
+    """Parse the type declarations of a pandoc-types version (with caching)"""
+    defs = pandoc.cache.load("definitions", version)
+    if defs is None:
+        defs_src = _load_data()["definitions"][version]
+        if not isinstance(defs_src, str):  # resource loaded as bytes in Python 3
+            defs_src = defs_src.decode("utf-8")
+        defs = parse(defs_src)
+        pandoc.cache.store("definitions", version, defs)
+    return defs
 
 
 def docstring(decl):